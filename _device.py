@@ -0,0 +1,47 @@
+"""
+Shared compute-device probe for the ChatterBox launcher scripts.
+
+run_gradio_app.py, simple_kaggle_example.py and kaggle_setup_check.py
+all report the available device; the probe runs once per process and
+the result is reused. Importing this module also configures the CUDA
+allocator, so it has to happen before torch initializes CUDA.
+
+Author: Resemble AI
+License: MIT
+"""
+
+import os
+import functools
+
+# The caching allocator reads this when CUDA initializes, which probe_device()
+# already does, so it is set on import. Variable-length generations otherwise
+# fragment the allocator and reserved VRAM creeps up until OOM
+os.environ.setdefault("PYTORCH_CUDA_ALLOC_CONF", "expandable_segments:True,max_split_size_mb:512")
+
+_TORCH = None
+
+def _torch():
+    """Import torch on first use and reuse the module afterwards"""
+    global _TORCH
+    if _TORCH is None:
+        import torch
+        _TORCH = torch
+    return _TORCH
+
+@functools.lru_cache(maxsize=1)
+def probe_device() -> tuple:
+    """Return (device, name, memory in GB) for the best available device
+
+    Raises ImportError if PyTorch is not installed.
+    """
+    torch = _torch()
+
+    if torch.cuda.is_available():
+        name = torch.cuda.get_device_name(0)
+        memory_gb = torch.cuda.get_device_properties(0).total_memory / 1e9
+        return "cuda", name, memory_gb
+
+    if torch.backends.mps.is_available():
+        return "mps", "Apple MPS", 0.0
+
+    return "cpu", "CPU", 0.0
@@ -12,40 +12,282 @@ Features demonstrated:
 - Collaborative testing environment
 
 Usage:
-    python demo_public_url.py
+    python demo_public_url.py [--launch] [--check-only]
 
 Author: Resemble AI
 License: MIT
 """
 
+import io
+import os
 import sys
-import time
-import subprocess
-from pathlib import Path
+import argparse
+import functools
+import importlib.util
+
+_REQUIRED_FILES = frozenset({
+    "enhanced_gradio_app.py",
+    "run_gradio_app.py",
+    "gradio_requirements.txt",
+})
+
+# Section separators
+_EQ60 = "=" * 60
+_DASH40 = "-" * 40
+
+# Static section text, returned by the *_text() functions below
+_BANNER = _EQ60 + """
+🎙️  ChatterBox TTS - Public URL Demo
+""" + _EQ60 + """
+
+This demo shows how to launch ChatterBox TTS with public URL
+sharing for easy remote access and collaboration.
+
+"""
+
+_PUBLIC_URL = """🌐 Public URL Sharing Demo
+""" + _DASH40 + """
+
+🎯 What happens when you launch with public URL:
+
+1. 🚀 Gradio starts the local server
+2. 📡 Creates a secure tunnel to Gradio's servers
+3. 🔗 Generates a public URL (e.g., https://abc123.gradio.live)
+4. 🌍 URL is accessible from anywhere in the world
+5. 📱 Works on any device with a web browser
+
+🔗 Example URLs you might see:
+   Local:  http://localhost:7860
+   Public: https://1a2b3c4d5e6f7g8h.gradio.live
+
+📊 Benefits:
+   ✅ No port forwarding needed
+   ✅ No firewall configuration required
+   ✅ Instant sharing with colleagues
+   ✅ Cross-platform compatibility
+   ✅ Secure HTTPS connection
+
+"""
+
+_LAUNCH_OPTIONS = """🚀 Launch Options
+""" + _DASH40 + """
+
+📋 Option 1: Default (with public URL)
+   python run_gradio_app.py
+   → Creates public URL automatically
+
+📋 Option 2: Direct app launch
+   python enhanced_gradio_app.py
+   → Also creates public URL by default
+
+📋 Option 3: Custom port with public URL
+   python run_gradio_app.py --port 8080
+   → Uses port 8080 + public URL
+
+📋 Option 4: Local only (no public URL)
+   python run_gradio_app.py --no-share
+   → Local access only
+
+📋 Option 5: Install dependencies first
+   python run_gradio_app.py --install-deps
+   → Installs packages then launches with public URL
+
+"""
+
+_LAUNCH_SNIPPET = """🧩 Launching From Your Own Code
+""" + _DASH40 + """
+
+📋 Recommended queued launch:
+   demo.queue(default_concurrency_limit=4).launch(
+       share=True,
+       server_name="0.0.0.0",
+       show_error=True,
+   )
+
+⚠️ GPU event handlers:
+   • If a .click() handler hangs while touching CUDA, register it with
+     queue=False so it runs in the server process:
+     btn.click(fn=generate, inputs=..., outputs=..., queue=False)
+   • If the public URL never appears, the share tunnel may be blocked;
+     the local URL keeps working in that case
+
+"""
+
+_SHARING_WORKFLOW = """📤 Sharing Workflow
+""" + _DASH40 + """
+
+🔄 Step-by-step sharing process:
+
+1. 🚀 Launch the app:
+   python run_gradio_app.py
+
+2. 📋 Copy the public URL from the output:
+   🔗 Public URL: https://abc123.gradio.live
+
+3. 📤 Share the URL via:
+   • 📧 Email
+   • 💬 Chat/Slack
+   • 📱 Text message
+   • 🐦 Social media
+
+4. 👥 Others can access immediately:
+   • No installation required
+   • Works on any device
+   • Full functionality available
+
+"""
+
+_USE_CASES_HEADER = """🎯 Use Cases for Public URLs
+""" + _DASH40 + """
+
+"""
+
+_USE_CASES = [
+    {
+        "title": "🎓 Educational Workshops",
+        "description": "Share with students for hands-on TTS learning",
+        "benefits": ["No setup time", "Universal access", "Interactive demos"]
+    },
+    {
+        "title": "🤝 Client Demonstrations",
+        "description": "Show ChatterBox capabilities to potential clients",
+        "benefits": ["Professional presentation", "Real-time interaction", "Easy access"]
+    },
+    {
+        "title": "👥 Team Collaboration",
+        "description": "Work together on voice projects remotely",
+        "benefits": ["Shared workspace", "Real-time testing", "Cross-platform"]
+    },
+    {
+        "title": "🔬 Research & Development",
+        "description": "Share with researchers for academic collaboration",
+        "benefits": ["Easy reproduction", "Parameter sharing", "Result comparison"]
+    },
+    {
+        "title": "🐛 Bug Reporting",
+        "description": "Let users reproduce issues easily",
+        "benefits": ["Exact reproduction", "Shared parameters", "Quick debugging"]
+    }
+]
+
+_SECURITY_INFO = """🔒 Security & Privacy
+""" + _DASH40 + """
+
+🛡️ Security Features:
+   ✅ HTTPS encryption automatically enabled
+   ✅ Temporary URLs (expire after 72 hours)
+   ✅ No permanent data storage on Gradio servers
+   ✅ Audio files processed locally only
+
+🔐 Privacy Considerations:
+   • Generated audio stays on your machine
+   • Only the interface is tunneled, not your data
+   • URLs are randomly generated and hard to guess
+   • You can disable public sharing anytime
+
+⚠️ Best Practices:
+   • Don't share URLs with sensitive content publicly
+   • Use --no-share for confidential work
+   • URLs expire automatically for security
+   • Monitor who has access to your URLs
+
+"""
+
+_READY = """🎉 Ready to Try?
+""" + _EQ60 + """
+
+🚀 Launch ChatterBox TTS with public URL:
+   python run_gradio_app.py
+
+📋 Or install dependencies first:
+   python run_gradio_app.py --install-deps
+
+🔗 The public URL will be displayed in the output.
+📤 Share it with anyone for instant access!
+
+💡 Tip: Keep this terminal open while others use the URL.
+
+"""
+
+def _write_bytes(data: bytes):
+    """Write pre-encoded output straight to the stdout file descriptor"""
+    try:
+        fd = sys.stdout.fileno()
+    except (AttributeError, io.UnsupportedOperation):
+        # stdout was replaced by an in-memory stream
+        sys.stdout.write(data.decode("utf-8"))
+        return
+
+    sys.stdout.flush()
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+def banner_text() -> str:
+    """Text of the demo banner"""
+    return _BANNER
+
+def public_url_text() -> str:
+    """Text of the public URL section"""
+    return _PUBLIC_URL
+
+def launch_options_text() -> str:
+    """Text of the launch options section"""
+    return _LAUNCH_OPTIONS
+
+def launch_snippet_text() -> str:
+    """Text of the launch-from-code section"""
+    return _LAUNCH_SNIPPET
+
+def sharing_workflow_text() -> str:
+    """Text of the sharing workflow section"""
+    return _SHARING_WORKFLOW
+
+@functools.lru_cache(maxsize=1)
+def use_cases_text() -> str:
+    """Text of the use cases section, formatted on first use"""
+    return _USE_CASES_HEADER + "".join(
+        f"{i}. {use_case['title']}\n"
+        f"   {use_case['description']}\n"
+        "   Benefits:\n"
+        + "".join(f"   • {benefit}\n" for benefit in use_case['benefits'])
+        + "\n"
+        for i, use_case in enumerate(_USE_CASES, 1)
+    )
+
+def security_info_text() -> str:
+    """Text of the security and privacy section"""
+    return _SECURITY_INFO
+
+def final_text() -> str:
+    """Text of the closing instructions"""
+    return _READY
+
+# Sections shown after the requirements check, in display order
+_SECTIONS = (
+    public_url_text,
+    launch_options_text,
+    launch_snippet_text,
+    sharing_workflow_text,
+    use_cases_text,
+    security_info_text,
+    final_text,
+)
+
+@functools.lru_cache(maxsize=1)
+def _render_sections() -> bytes:
+    """Join and encode every section once, on first use"""
+    return "\n".join(["", *(section() for section in _SECTIONS)]).encode("utf-8")
 
 def print_banner():
     """Print a nice banner for the demo"""
-    print("=" * 60)
-    print("🎙️  ChatterBox TTS - Public URL Demo")
-    print("=" * 60)
-    print()
-    print("This demo shows how to launch ChatterBox TTS with public URL")
-    print("sharing for easy remote access and collaboration.")
-    print()
+    sys.stdout.write(banner_text())
 
 def check_requirements():
     """Check if the required files exist"""
-    required_files = [
-        "enhanced_gradio_app.py",
-        "run_gradio_app.py", 
-        "gradio_requirements.txt"
-    ]
-    
-    missing_files = []
-    for file_path in required_files:
-        if not Path(file_path).exists():
-            missing_files.append(file_path)
-    
+    # One directory read instead of a stat() per file
+    missing_files = sorted(_REQUIRED_FILES - {entry.name for entry in os.scandir('.')})
+
     if missing_files:
         print("❌ Missing required files:")
         for file_path in missing_files:
@@ -53,205 +295,52 @@ def check_requirements():
         print()
         print("💡 Please ensure you have all the Gradio app files.")
         return False
-    
+
     print("✅ All required files found")
     return True
 
-def demonstrate_public_url():
-    """Demonstrate the public URL feature"""
-    print("🌐 Public URL Sharing Demo")
-    print("-" * 40)
-    print()
-    
-    print("🎯 What happens when you launch with public URL:")
-    print()
-    print("1. 🚀 Gradio starts the local server")
-    print("2. 📡 Creates a secure tunnel to Gradio's servers")
-    print("3. 🔗 Generates a public URL (e.g., https://abc123.gradio.live)")
-    print("4. 🌍 URL is accessible from anywhere in the world")
-    print("5. 📱 Works on any device with a web browser")
-    print()
-    
-    print("🔗 Example URLs you might see:")
-    print("   Local:  http://localhost:7860")
-    print("   Public: https://1a2b3c4d5e6f7g8h.gradio.live")
-    print()
-    
-    print("📊 Benefits:")
-    print("   ✅ No port forwarding needed")
-    print("   ✅ No firewall configuration required")
-    print("   ✅ Instant sharing with colleagues")
-    print("   ✅ Cross-platform compatibility")
-    print("   ✅ Secure HTTPS connection")
-    print()
-
-def show_launch_options():
-    """Show different ways to launch with public URLs"""
-    print("🚀 Launch Options")
-    print("-" * 40)
-    print()
-    
-    print("📋 Option 1: Default (with public URL)")
-    print("   python run_gradio_app.py")
-    print("   → Creates public URL automatically")
-    print()
-    
-    print("📋 Option 2: Direct app launch")
-    print("   python enhanced_gradio_app.py")
-    print("   → Also creates public URL by default")
-    print()
-    
-    print("📋 Option 3: Custom port with public URL")
-    print("   python run_gradio_app.py --port 8080")
-    print("   → Uses port 8080 + public URL")
-    print()
-    
-    print("📋 Option 4: Local only (no public URL)")
-    print("   python run_gradio_app.py --no-share")
-    print("   → Local access only")
-    print()
-    
-    print("📋 Option 5: Install dependencies first")
-    print("   python run_gradio_app.py --install-deps")
-    print("   → Installs packages then launches with public URL")
-    print()
-
-def show_sharing_workflow():
-    """Show how to share the public URL"""
-    print("📤 Sharing Workflow")
-    print("-" * 40)
-    print()
-    
-    print("🔄 Step-by-step sharing process:")
-    print()
-    print("1. 🚀 Launch the app:")
-    print("   python run_gradio_app.py")
-    print()
-    print("2. 📋 Copy the public URL from the output:")
-    print("   🔗 Public URL: https://abc123.gradio.live")
-    print()
-    print("3. 📤 Share the URL via:")
-    print("   • 📧 Email")
-    print("   • 💬 Chat/Slack")
-    print("   • 📱 Text message")
-    print("   • 🐦 Social media")
-    print()
-    print("4. 👥 Others can access immediately:")
-    print("   • No installation required")
-    print("   • Works on any device")
-    print("   • Full functionality available")
-    print()
-
-def show_use_cases():
-    """Show practical use cases for public URLs"""
-    print("🎯 Use Cases for Public URLs")
-    print("-" * 40)
-    print()
-    
-    use_cases = [
-        {
-            "title": "🎓 Educational Workshops",
-            "description": "Share with students for hands-on TTS learning",
-            "benefits": ["No setup time", "Universal access", "Interactive demos"]
-        },
-        {
-            "title": "🤝 Client Demonstrations", 
-            "description": "Show ChatterBox capabilities to potential clients",
-            "benefits": ["Professional presentation", "Real-time interaction", "Easy access"]
-        },
-        {
-            "title": "👥 Team Collaboration",
-            "description": "Work together on voice projects remotely",
-            "benefits": ["Shared workspace", "Real-time testing", "Cross-platform"]
-        },
-        {
-            "title": "🔬 Research & Development",
-            "description": "Share with researchers for academic collaboration",
-            "benefits": ["Easy reproduction", "Parameter sharing", "Result comparison"]
-        },
-        {
-            "title": "🐛 Bug Reporting",
-            "description": "Let users reproduce issues easily",
-            "benefits": ["Exact reproduction", "Shared parameters", "Quick debugging"]
-        }
+def show_bytecode_tip():
+    """Suggest pre-compiling the app modules if they have no cached bytecode"""
+    # The __main__ script is never loaded from __pycache__, but the app
+    # modules are imported on launch and benefit from a warm cache.
+    modules = ["run_gradio_app.py", "enhanced_gradio_app.py"]
+    uncompiled = [
+        m for m in modules
+        if not os.path.exists(importlib.util.cache_from_source(m))
     ]
-    
-    for i, use_case in enumerate(use_cases, 1):
-        print(f"{i}. {use_case['title']}")
-        print(f"   {use_case['description']}")
-        print("   Benefits:")
-        for benefit in use_case['benefits']:
-            print(f"   • {benefit}")
+    if uncompiled:
+        print("⚡ Tip: Pre-compile the app for a faster first launch:")
+        print(f"   python -m compileall {' '.join(uncompiled)}")
         print()
 
-def show_security_info():
-    """Show security and privacy information"""
-    print("🔒 Security & Privacy")
-    print("-" * 40)
-    print()
-    
-    print("🛡️ Security Features:")
-    print("   ✅ HTTPS encryption automatically enabled")
-    print("   ✅ Temporary URLs (expire after 72 hours)")
-    print("   ✅ No permanent data storage on Gradio servers")
-    print("   ✅ Audio files processed locally only")
-    print()
-    
-    print("🔐 Privacy Considerations:")
-    print("   • Generated audio stays on your machine")
-    print("   • Only the interface is tunneled, not your data")
-    print("   • URLs are randomly generated and hard to guess")
-    print("   • You can disable public sharing anytime")
-    print()
-    
-    print("⚠️ Best Practices:")
-    print("   • Don't share URLs with sensitive content publicly")
-    print("   • Use --no-share for confidential work")
-    print("   • URLs expire automatically for security")
-    print("   • Monitor who has access to your URLs")
-    print()
-
 def main():
     """Main demo function"""
+    parser = argparse.ArgumentParser(
+        description="ChatterBox TTS Public URL Demo"
+    )
+    parser.add_argument("--launch", action="store_true",
+                       help="Launch the Gradio app with a public URL after the demo")
+    parser.add_argument("--check-only", "--quiet", dest="check_only", action="store_true",
+                       help="Only check for the required files and exit (status 0/1)")
+    args = parser.parse_args()
+
+    if args.check_only:
+        sys.exit(0 if check_requirements() else 1)
+
     print_banner()
-    
+
     # Check requirements
     if not check_requirements():
         return
-    
-    print()
-    
-    # Show different sections
-    demonstrate_public_url()
-    print()
-    
-    show_launch_options()
-    print()
-    
-    show_sharing_workflow()
-    print()
-    
-    show_use_cases()
-    print()
-    
-    show_security_info()
-    print()
-    
-    # Final instructions
-    print("🎉 Ready to Try?")
-    print("=" * 60)
-    print()
-    print("🚀 Launch ChatterBox TTS with public URL:")
-    print("   python run_gradio_app.py")
-    print()
-    print("📋 Or install dependencies first:")
-    print("   python run_gradio_app.py --install-deps")
-    print()
-    print("🔗 The public URL will be displayed in the output.")
-    print("📤 Share it with anyone for instant access!")
-    print()
-    print("💡 Tip: Keep this terminal open while others use the URL.")
-    print()
+
+    # Show all remaining sections in a single write
+    _write_bytes(_render_sections())
+    show_bytecode_tip()
+
+    if args.launch:
+        # Launch in-process to avoid a second interpreter and Gradio import
+        from run_gradio_app import main as launch_main
+        launch_main([])
 
 if __name__ == "__main__":
     main()
@@ -20,71 +20,240 @@ License: MIT
 """
 
 import os
+import gc
 import sys
 import time
 import random
-import traceback
+import itertools
+import logging
+import threading
+import functools
+import importlib.util
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, Tuple, List
+from typing import TYPE_CHECKING, Optional, Tuple, List
+
+# Configures the CUDA allocator, so it must be imported before torch; the
+# launcher (run_gradio_app.py) imports it first as well
+import _device  # noqa: F401
 
 import torch
 import numpy as np
-import gradio as gr
-import torchaudio
+import soundfile as sf
 
-# Import ChatterBox models
+# ChatterBox (transformers, librosa, ...) and Gradio are imported on first use;
+# only check that the package is there without importing it
 try:
+    CHATTERBOX_AVAILABLE = importlib.util.find_spec("chatterbox") is not None
+except ValueError:  # already in sys.modules without a spec
+    CHATTERBOX_AVAILABLE = "chatterbox" in sys.modules
+if not CHATTERBOX_AVAILABLE:
+    print("⚠️ ChatterBox not available: package not installed")
+
+if TYPE_CHECKING:
     from chatterbox.tts import ChatterboxTTS
     from chatterbox.vc import ChatterboxVC
-    CHATTERBOX_AVAILABLE = True
-except ImportError as e:
-    print(f"⚠️ ChatterBox not available: {e}")
-    CHATTERBOX_AVAILABLE = False
 
 # Global configuration
 DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+# The tokenizer emits at most one token per character (two after punc_norm
+# expands "…"), so this also keeps texts well inside T3's 2048-token budget
 MAX_TEXT_LENGTH = 500
+MAX_AUDIO_SECONDS = 60  # longer voice conversion inputs run out of memory
 SAMPLE_RATE = 24000
 AUDIO_HISTORY_DIR = Path("audio_history")
 AUDIO_HISTORY_DIR.mkdir(exist_ok=True)
 
+# Full tracebacks go here instead of into the status box (file created on first error)
+ERROR_LOG_FILE = Path("chatterbox_errors.log")
+_error_log_handler = logging.FileHandler(ERROR_LOG_FILE, delay=True)
+_error_log_handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+logger = logging.getLogger("chatterbox_app")
+logger.addHandler(_error_log_handler)
+logger.propagate = False
+
+# Run the T3 transformer in half precision on CUDA: bf16 where supported,
+# otherwise fp16 (e.g. Kaggle's T4 and other pre-Ampere GPUs). Sampling and
+# the s3gen vocoder stay in fp32. Set HALF_PRECISION=0 to keep T3 in fp32,
+# e.g. if fp16 output sounds wrong on such a GPU.
+HALF_PRECISION = os.environ.get("HALF_PRECISION", "1") == "1" and DEVICE == "cuda"
+
+# Opt-in weight quantization of the T3 transformer for small GPUs
+# (QUANT_MODE=int8 or nf4, needs bitsandbytes); the vocoder stays fp32
+QUANT_MODE = os.environ.get("QUANT_MODE", "none").lower() if DEVICE == "cuda" else "none"
+
+# Only release cached CUDA memory when this much is reserved but unused
+CUDA_CACHE_SLACK_BYTES = 2 * 1024**3
+
+# Opt-in torch.compile of the hot submodules (set COMPILE=1, needs torch>=2.0)
+COMPILE_MODELS = os.environ.get("COMPILE", "0") == "1" and hasattr(torch, "compile")
+
+# Opt-in TorchScript path for setups without torch.compile (set JIT_SCRIPT=1)
+JIT_SCRIPT_MODELS = os.environ.get("JIT_SCRIPT", "0") == "1" and not COMPILE_MODELS
+
+# Opt-in CUDA graph replay of the T3 decode step (set CUDA_GRAPHS=1, CUDA only).
+# The graph has one static KV cache, so only one generation at a time uses it;
+# requests running alongside it (see default_concurrency_limit) decode eagerly.
+CUDA_GRAPHS = (
+    os.environ.get("CUDA_GRAPHS", "0") == "1" and DEVICE == "cuda"
+    and not COMPILE_MODELS and QUANT_MODE == "none"
+)
+
 # Global model states
 tts_model = None
 vc_model = None
 
-def set_seed(seed: int):
-    """Set random seed for reproducible generation"""
+# Built-in voice conditioning, restored when no reference audio is given
+tts_default_conds = None
+vc_default_ref_dict = None
+
+# Single background writer so history saves overlap with returning the audio
+_history_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audio-history")
+
+# In-memory index of the history directory: path -> size in bytes, oldest first
+_history_index = {}
+_history_bytes = 0
+_history_lock = threading.Lock()
+
+# Per-process sequence number in history filenames; a batch saves several
+# clips within the same microsecond tick on coarse clocks
+_history_counter = itertools.count()
+
+# Concurrent TTS requests are batched by the Gradio queue up to this size
+MAX_TTS_BATCH_SIZE = 4
+
+# Reference audio conditioning keyed by (kind, path, mtime), most recent last
+REF_AUDIO_CACHE_SIZE = 8
+_ref_audio_cache = OrderedDict()
+
+def make_generator(seed: int) -> Tuple[torch.Generator, int]:
+    """Create a private RNG for one generation; seed 0 picks a random seed"""
     if seed == 0:
         seed = random.randint(1, 1000000)
     
-    torch.manual_seed(seed)
-    torch.cuda.manual_seed_all(seed)
-    random.seed(seed)
-    np.random.seed(seed)
-    return seed
+    # Leaves the global RNGs alone so concurrent requests don't reseed each other
+    generator = torch.Generator(device=DEVICE)
+    generator.manual_seed(seed)
+    return generator, seed
+
+@functools.lru_cache(maxsize=1)
+def _gpu_description() -> str:
+    """GPU name and total memory; these don't change while the app runs"""
+    gpu_name = torch.cuda.get_device_name(0)
+    gpu_memory = torch.cuda.get_device_properties(0).total_memory / 1e9
+    return f"🚀 GPU: {gpu_name} ({gpu_memory:.1f}GB)"
 
 def get_device_info() -> str:
     """Get detailed device information"""
-    info = []
-    info.append(f"🖥️ Device: {DEVICE}")
-    
     if torch.cuda.is_available():
-        gpu_name = torch.cuda.get_device_name(0)
-        gpu_memory = torch.cuda.get_device_properties(0).total_memory / 1e9
-        info.append(f"🚀 GPU: {gpu_name} ({gpu_memory:.1f}GB)")
-        
         allocated = torch.cuda.memory_allocated() / 1e9
         cached = torch.cuda.memory_reserved() / 1e9
-        info.append(f"💾 Memory: {allocated:.2f}GB allocated, {cached:.2f}GB cached")
-    else:
-        info.append("💻 Using CPU (no GPU available)")
+        return (
+            f"🖥️ Device: {DEVICE}\n"
+            f"{_gpu_description()}\n"
+            f"💾 Memory: {allocated:.2f}GB allocated, {cached:.2f}GB cached"
+        )
+    
+    return f"🖥️ Device: {DEVICE}\n💻 Using CPU (no GPU available)"
+
+def release_cuda_cache():
+    """Return cached CUDA blocks to the driver once the unused pool grows large"""
+    if not torch.cuda.is_available():
+        return
     
-    return "\n".join(info)
+    # Emptying on every call would defeat the allocator's block reuse
+    if torch.cuda.memory_reserved() - torch.cuda.memory_allocated() > CUDA_CACHE_SLACK_BYTES:
+        gc.collect()
+        torch.cuda.empty_cache()
+
+def get_cached_reference(kind: str, path: str, prepare):
+    """Return conditioning for a reference audio file, preparing it on a cache miss"""
+    key = (kind, path, os.path.getmtime(path))
+    if key in _ref_audio_cache:
+        _ref_audio_cache.move_to_end(key)
+        return _ref_audio_cache[key]
+    
+    value = prepare(path)
+    _ref_audio_cache[key] = value
+    if len(_ref_audio_cache) > REF_AUDIO_CACHE_SIZE:
+        _ref_audio_cache.popitem(last=False)
+    return value
+
+def compile_submodules(targets: List[Tuple[torch.nn.Module, str]]) -> List[Tuple[torch.nn.Module, str]]:
+    """Wrap each parent.<name> submodule with torch.compile"""
+    # Only forward() is compiled, so targets are the inner networks called
+    # from the models' custom inference() methods, not the models themselves
+    compiled = []
+    for parent, name in targets:
+        module = getattr(parent, name)
+        module.eval()
+        setattr(parent, name, torch.compile(module, mode="reduce-overhead", fullgraph=False))
+        compiled.append((parent, name))
+    return compiled
+
+def uncompile_submodules(compiled: List[Tuple[torch.nn.Module, str]]):
+    """Restore the eager modules replaced by compile_submodules"""
+    for parent, name in compiled:
+        setattr(parent, name, getattr(parent, name)._orig_mod)
+
+def jit_script_submodule(parent: torch.nn.Module, name: str) -> bool:
+    """Replace parent.<name> with a scripted, inference-optimized module"""
+    module = getattr(parent, name)
+    try:
+        scripted = torch.jit.script(module.eval())
+        # Freezes parameters and folds BatchNorm/Dropout into the graph
+        scripted = torch.jit.optimize_for_inference(scripted)
+    except Exception as e:
+        print(f"⚠️ TorchScript failed for {type(module).__name__}, using eager mode: {e}")
+        return False
+    setattr(parent, name, scripted)
+    return True
+
+def quantize_linear_layers(module: torch.nn.Module, mode: str) -> int:
+    """Replace every nn.Linear inside module with a bitsandbytes int8/nf4 layer"""
+    import bitsandbytes as bnb
+    
+    replaced = 0
+    for parent in list(module.modules()):
+        for name, child in list(parent.named_children()):
+            if not isinstance(child, torch.nn.Linear):
+                continue
+            has_bias = child.bias is not None
+            if mode == "int8":
+                qlinear = bnb.nn.Linear8bitLt(
+                    child.in_features, child.out_features, bias=has_bias,
+                    has_fp16_weights=False, threshold=6.0
+                )
+                qlinear.weight = bnb.nn.Int8Params(
+                    child.weight.data.cpu(), requires_grad=False, has_fp16_weights=False
+                )
+            else:
+                qlinear = bnb.nn.Linear4bit(
+                    child.in_features, child.out_features, bias=has_bias,
+                    compute_dtype=child.weight.dtype, quant_type="nf4"
+                )
+                qlinear.weight = bnb.nn.Params4bit(
+                    child.weight.data.cpu(), requires_grad=False, quant_type="nf4"
+                )
+            if has_bias:
+                qlinear.bias = torch.nn.Parameter(child.bias.data.cpu(), requires_grad=False)
+            # Weights are quantized when moved to the GPU
+            setattr(parent, name, qlinear.to(child.weight.device))
+            replaced += 1
+    return replaced
+
+def from_pretrained_cached(model_cls):
+    """Load from the local Hugging Face cache, only going to the Hub when files are missing"""
+    try:
+        return model_cls.from_pretrained(device=DEVICE, local_files_only=True)
+    except FileNotFoundError:
+        return model_cls.from_pretrained(device=DEVICE)
 
-def load_tts_model() -> Tuple[Optional[ChatterboxTTS], str]:
+def load_tts_model() -> Tuple[Optional["ChatterboxTTS"], str]:
     """Load ChatterBox TTS model with error handling"""
-    global tts_model
+    global tts_model, tts_default_conds
     
     if not CHATTERBOX_AVAILABLE:
         return None, "❌ ChatterBox not installed. Please install with: pip install chatterbox-tts"
@@ -93,12 +262,59 @@ def load_tts_model() -> Tuple[Optional[ChatterboxTTS], str]:
         if tts_model is None:
             print("📥 Loading ChatterBox TTS model...")
             start_time = time.time()
-            tts_model = ChatterboxTTS.from_pretrained(device=DEVICE)
+            from chatterbox.tts import ChatterboxTTS
+            tts_model = from_pretrained_cached(ChatterboxTTS)
+            tts_default_conds = tts_model.conds
+            
+            if HALF_PRECISION:
+                # Decoding is bandwidth-bound on the KV cache; half the bytes per step
+                t3_dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+                tts_model.t3.to(t3_dtype)
+            
+            quant_status = ""
+            if QUANT_MODE in ("int8", "nf4"):
+                allocated_before = torch.cuda.memory_allocated()
+                try:
+                    # Only the transformer body; embeddings and heads keep full precision
+                    replaced = quantize_linear_layers(tts_model.t3.tfmr, QUANT_MODE)
+                    saved_mb = (allocated_before - torch.cuda.memory_allocated()) / 1024**2
+                    quant_status = f"\n🗜️ T3 quantized to {QUANT_MODE}: {replaced} layers, {saved_mb:.0f} MB VRAM saved"
+                except ImportError:
+                    print(f"⚠️ QUANT_MODE={QUANT_MODE} needs bitsandbytes (pip install bitsandbytes), skipping")
+            elif QUANT_MODE != "none":
+                print(f"⚠️ Unknown QUANT_MODE '{QUANT_MODE}', expected none, int8 or nf4")
+            
+            if COMPILE_MODELS:
+                print("⚙️ Compiling TTS model (first run takes a while)...")
+                compiled = compile_submodules([
+                    (tts_model.t3, "tfmr"),
+                    (tts_model.s3gen.flow.decoder, "estimator"),
+                ])
+                try:
+                    # Pay the compile cost now rather than on the first request
+                    tts_model.generate("warmup text", exaggeration=0.5, cfg_weight=0.5, temperature=0.8)
+                except Exception as e:
+                    print(f"⚠️ torch.compile warmup failed, using eager mode: {e}")
+                    uncompile_submodules(compiled)
+            elif JIT_SCRIPT_MODELS:
+                jit_script_submodule(tts_model.s3gen.flow.decoder, "estimator")
+            
+            if CUDA_GRAPHS:
+                tts_model.t3.enable_cuda_graphs()
+                try:
+                    # Capture the decode step now rather than on the first request
+                    tts_model.generate("warmup text", exaggeration=0.5, cfg_weight=0.5, temperature=0.8)
+                except Exception as e:
+                    print(f"⚠️ CUDA graph capture failed, using eager decoding: {e}")
+                    tts_model.t3.disable_cuda_graphs()
+            
             load_time = time.time() - start_time
             
             status = f"✅ TTS Model loaded successfully in {load_time:.1f}s\n"
             status += f"🎵 Sample rate: {tts_model.sr} Hz\n"
-            status += f"🎯 Device: {tts_model.device}"
+            status += f"🎯 Device: {tts_model.device}\n"
+            status += f"🔢 T3 precision: {tts_model.t3.dtype}"
+            status += quant_status
             return tts_model, status
         else:
             return tts_model, "✅ TTS Model already loaded"
@@ -111,9 +327,9 @@ def load_tts_model() -> Tuple[Optional[ChatterboxTTS], str]:
         error_msg += "3. Try restarting if memory issues occur"
         return None, error_msg
 
-def load_vc_model() -> Tuple[Optional[ChatterboxVC], str]:
+def load_vc_model() -> Tuple[Optional["ChatterboxVC"], str]:
     """Load ChatterBox VC model with error handling"""
-    global vc_model
+    global vc_model, vc_default_ref_dict
     
     if not CHATTERBOX_AVAILABLE:
         return None, "❌ ChatterBox not installed. Please install with: pip install chatterbox-tts"
@@ -122,7 +338,16 @@ def load_vc_model() -> Tuple[Optional[ChatterboxVC], str]:
         if vc_model is None:
             print("📥 Loading ChatterBox VC model...")
             start_time = time.time()
-            vc_model = ChatterboxVC.from_pretrained(device=DEVICE)
+            from chatterbox.vc import ChatterboxVC
+            vc_model = from_pretrained_cached(ChatterboxVC)
+            vc_default_ref_dict = vc_model.ref_dict
+            
+            if COMPILE_MODELS:
+                # No warmup here: VC needs an input recording to run
+                compile_submodules([(vc_model.s3gen.flow.decoder, "estimator")])
+            elif JIT_SCRIPT_MODELS:
+                jit_script_submodule(vc_model.s3gen.flow.decoder, "estimator")
+            
             load_time = time.time() - start_time
             
             status = f"✅ VC Model loaded successfully in {load_time:.1f}s\n"
@@ -140,24 +365,135 @@ def load_vc_model() -> Tuple[Optional[ChatterboxVC], str]:
         error_msg += "3. Try restarting if memory issues occur"
         return None, error_msg
 
+def write_wav(filepath: Path, audio_data: np.ndarray, sample_rate: int):
+    """Write audio as 16-bit PCM WAV"""
+    # Write 16-bit PCM directly, skipping torchaudio's backend dispatch
+    audio_int16 = (np.clip(audio_data, -1.0, 1.0) * 32767).astype(np.int16)
+    sf.write(str(filepath), audio_int16, sample_rate, subtype="PCM_16")
+
 def save_audio_to_history(audio_data: np.ndarray, sample_rate: int, prefix: str = "generated") -> str:
-    """Save generated audio to history directory"""
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{prefix}_{timestamp}.wav"
+    """Save generated audio to history directory in the background"""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    filename = f"{prefix}_{timestamp}_{next(_history_counter)}.wav"
     filepath = AUDIO_HISTORY_DIR / filename
     
-    # Convert to tensor if needed
-    if isinstance(audio_data, np.ndarray):
-        audio_tensor = torch.from_numpy(audio_data)
-    else:
-        audio_tensor = audio_data
+    # 44-byte header + 16-bit samples; known up front so the write can stay in the background.
+    # Indexed before submitting so a fast failure can't run its cleanup first
+    _index_history_file(str(filepath), 44 + 2 * audio_data.size)
+    future = _history_writer.submit(write_wav, filepath, audio_data, sample_rate)
+    future.add_done_callback(functools.partial(_history_write_done, str(filepath)))
+    return str(filepath)
+
+def _history_write_done(path: str, future):
+    """Drop a history entry whose background write failed"""
+    error = future.exception()
+    if error is not None:
+        logger.error("Saving %s to history failed: %s", path, error, exc_info=error)
+        _unindex_history_file(path)
+
+def _index_history_file(path: str, size: int):
+    """Add or replace a file in the in-memory history index"""
+    global _history_bytes
+    with _history_lock:
+        _history_bytes += size - _history_index.pop(path, 0)
+        _history_index[path] = size
+
+def _unindex_history_file(path: str):
+    """Remove a file from the in-memory history index, if present"""
+    global _history_bytes
+    with _history_lock:
+        _history_bytes -= _history_index.pop(path, 0)
+
+def _load_history_index():
+    """Index the existing history directory once at startup"""
+    entries = [e for e in os.scandir(AUDIO_HISTORY_DIR) if e.name.endswith(".wav") and e.is_file()]
+    for entry in sorted(entries, key=lambda e: e.name):
+        _index_history_file(entry.path, entry.stat().st_size)
+
+_load_history_index()
+
+def format_error(action: str, e: Exception) -> str:
+    """Short status message for a failed action; the full traceback is logged"""
+    if isinstance(e, torch.cuda.OutOfMemoryError):
+        # The stack adds nothing here, so don't spend time formatting it
+        logger.error("%s: CUDA out of memory: %s", action, e)
+        return (
+            f"❌ {action}: GPU out of memory\n\n"
+            "💡 Try shorter text or input audio, or restart with QUANT_MODE=int8 to shrink the TTS model"
+        )
+    
+    logger.exception(action)
+    return f"❌ {action}: {type(e).__name__}: {e}\n\n🔍 Full traceback: System & History tab or {ERROR_LOG_FILE}"
+
+def get_last_traceback(max_lines: int = 60) -> str:
+    """Read the end of the error log"""
+    try:
+        with open(ERROR_LOG_FILE, encoding="utf-8") as f:
+            return "".join(deque(f, maxlen=max_lines)) or "No errors logged"
+    except FileNotFoundError:
+        return "No errors logged"
+
+def validate_tts_text(text: str) -> Optional[str]:
+    """Return an error message if the text cannot be synthesized"""
+    if not text or not text.strip():
+        return "❌ Please enter some text to synthesize"
     
-    # Ensure correct shape
-    if audio_tensor.dim() == 1:
-        audio_tensor = audio_tensor.unsqueeze(0)
+    if len(text) > MAX_TEXT_LENGTH:
+        return f"❌ Text too long. Maximum {MAX_TEXT_LENGTH} characters allowed."
     
-    torchaudio.save(str(filepath), audio_tensor, sample_rate)
-    return str(filepath)
+    return None
+
+def validate_vc_audio(input_audio: str) -> Optional[str]:
+    """Return an error message if the input audio is too long to convert"""
+    try:
+        duration = sf.info(input_audio).duration
+    except RuntimeError:
+        return None  # not readable by libsndfile; let the model's loader handle it
+    if duration > MAX_AUDIO_SECONDS:
+        return f"❌ Input audio too long ({duration:.0f}s). Maximum {MAX_AUDIO_SECONDS} seconds allowed."
+    return None
+
+def resolve_preset(preset: str, exaggeration: float, cfg_weight: float, temperature: float) -> Tuple[float, float, float]:
+    """Return the preset's generation settings, or the given ones for 'Custom'"""
+    if preset != "Custom":
+        config = _PRESET_CONFIGS.get(preset)
+        if config is not None:
+            return config["exaggeration"], config["cfg_weight"], config["temperature"]
+    
+    return exaggeration, cfg_weight, temperature
+
+def use_reference_conditionals(model, reference_audio, exaggeration: float):
+    """Point the TTS model at the conditioning for the reference audio or built-in voice"""
+    def prepare(path):
+        model.prepare_conditionals(path, exaggeration=exaggeration)
+        return model.conds
+    
+    # Reuse the voice-encoder/tokenizer outputs for a known reference
+    if reference_audio is not None:
+        model.conds = get_cached_reference("tts", reference_audio, prepare)
+    else:
+        model.conds = tts_default_conds
+
+_TTS_STATUS_TEMPLATE = (
+    "✅ Generated {duration:.1f}s audio in {generation_time:.1f}s\n"
+    "📊 Real-time factor: {rtf:.2f}x\n"
+    "🎲 Seed used: {seed}\n"
+    "💾 Saved to: {history_path}\n"
+    "🎛️ Settings: exag={exaggeration}, cfg={cfg_weight}, temp={temperature}"
+)
+
+def format_tts_status(
+    duration: float,
+    generation_time: float,
+    seed: int,
+    history_path: str,
+    exaggeration: float,
+    cfg_weight: float,
+    temperature: float
+) -> str:
+    """Build the status message for a finished TTS generation"""
+    rtf = generation_time / duration
+    return _TTS_STATUS_TEMPLATE.format_map(locals())
 
 def generate_tts(
     text: str,
@@ -170,11 +506,9 @@ def generate_tts(
 ) -> Tuple[Optional[Tuple[int, np.ndarray]], str]:
     """Generate TTS audio with comprehensive error handling"""
     
-    if not text or not text.strip():
-        return None, "❌ Please enter some text to synthesize"
-    
-    if len(text) > MAX_TEXT_LENGTH:
-        return None, f"❌ Text too long. Maximum {MAX_TEXT_LENGTH} characters allowed."
+    error = validate_tts_text(text)
+    if error:
+        return None, error
     
     # Load model if needed
     model, status = load_tts_model()
@@ -183,16 +517,10 @@ def generate_tts(
     
     try:
         # Apply preset if selected
-        if preset != "Custom":
-            preset_configs = get_preset_configs()
-            if preset in preset_configs:
-                config = preset_configs[preset]
-                exaggeration = config["exaggeration"]
-                cfg_weight = config["cfg_weight"]
-                temperature = config["temperature"]
+        exaggeration, cfg_weight, temperature = resolve_preset(preset, exaggeration, cfg_weight, temperature)
         
-        # Set seed for reproducibility
-        actual_seed = set_seed(seed)
+        # Seeded RNG for reproducibility
+        generator, actual_seed = make_generator(seed)
         
         # Generate audio
         start_time = time.time()
@@ -200,13 +528,13 @@ def generate_tts(
         generation_params = {
             "exaggeration": exaggeration,
             "cfg_weight": cfg_weight,
-            "temperature": temperature
+            "temperature": temperature,
+            "generator": generator
         }
         
-        if reference_audio is not None:
-            generation_params["audio_prompt_path"] = reference_audio
-        
-        wav = model.generate(text, **generation_params)
+        with torch.inference_mode():
+            use_reference_conditionals(model, reference_audio, exaggeration)
+            wav = model.generate(text, **generation_params)
         generation_time = time.time() - start_time
         
         # Convert to numpy for Gradio
@@ -217,40 +545,196 @@ def generate_tts(
         
         # Calculate stats
         duration = len(audio_np) / model.sr
-        rtf = generation_time / duration
         
-        status_msg = f"✅ Generated {duration:.1f}s audio in {generation_time:.1f}s\n"
-        status_msg += f"📊 Real-time factor: {rtf:.2f}x\n"
-        status_msg += f"🎲 Seed used: {actual_seed}\n"
-        status_msg += f"💾 Saved to: {history_path}\n"
-        status_msg += f"🎛️ Settings: exag={exaggeration}, cfg={cfg_weight}, temp={temperature}"
+        status_msg = format_tts_status(
+            duration, generation_time, actual_seed, history_path,
+            exaggeration, cfg_weight, temperature
+        )
         
         return (model.sr, audio_np), status_msg
         
     except Exception as e:
-        error_msg = f"❌ Generation failed: {str(e)}\n\n"
-        error_msg += f"🔍 Debug info:\n{traceback.format_exc()}"
-        return None, error_msg
+        return None, format_error("Generation failed", e)
+    
+    finally:
+        release_cuda_cache()
+
+def generate_tts_stream(
+    text: str,
+    reference_audio,
+    exaggeration: float,
+    cfg_weight: float,
+    temperature: float,
+    seed: int,
+    preset: str
+):
+    """Stream TTS audio to the UI chunk by chunk while it is being generated"""
+    import gradio as gr
+    
+    error = validate_tts_text(text)
+    if error:
+        yield None, error
+        return
+    
+    # Load model if needed
+    model, status = load_tts_model()
+    if model is None:
+        yield None, status
+        return
+    
+    try:
+        exaggeration, cfg_weight, temperature = resolve_preset(preset, exaggeration, cfg_weight, temperature)
+        generator, actual_seed = make_generator(seed)
+        
+        start_time = time.time()
+        with torch.inference_mode():
+            use_reference_conditionals(model, reference_audio, exaggeration)
+        
+        chunks = []
+        first_chunk_time = None
+        for wav in model.generate_stream(
+            text,
+            exaggeration=exaggeration,
+            cfg_weight=cfg_weight,
+            temperature=temperature,
+            generator=generator
+        ):
+            chunk_np = wav.squeeze(0).numpy()
+            if first_chunk_time is None:
+                first_chunk_time = time.time() - start_time
+            chunks.append(chunk_np)
+            yield (model.sr, chunk_np), f"🎧 Streaming... first audio after {first_chunk_time:.2f}s"
+        generation_time = time.time() - start_time
+        
+        if not chunks:
+            yield gr.update(), "❌ Generation failed: no audio generated"
+            return
+        
+        # Save the full clip to history
+        audio_np = np.concatenate(chunks)
+        history_path = save_audio_to_history(audio_np, model.sr, "tts")
+        duration = len(audio_np) / model.sr
+        
+        status_msg = format_tts_status(
+            duration, generation_time, actual_seed, history_path,
+            exaggeration, cfg_weight, temperature
+        )
+        if first_chunk_time is not None:
+            status_msg += f"\n⚡ First audio after: {first_chunk_time:.2f}s"
+        yield gr.update(), status_msg
+        
+    except Exception as e:
+        yield gr.update(), format_error("Generation failed", e)
+    
+    finally:
+        release_cuda_cache()
+
+def generate_tts_group(
+    texts: List[str],
+    reference_audio,
+    exaggeration: float,
+    cfg_weight: float,
+    temperature: float
+) -> List[Tuple[Optional[Tuple[int, np.ndarray]], str]]:
+    """Generate several texts that share a voice and settings in one batched decode"""
+    
+    model, status = load_tts_model()
+    if model is None:
+        return [(None, status)] * len(texts)
+    
+    try:
+        # Batched requests share one random stream, so only unseeded requests get here
+        generator, actual_seed = make_generator(0)
+        
+        start_time = time.time()
+        
+        with torch.inference_mode():
+            use_reference_conditionals(model, reference_audio, exaggeration)
+            wavs = model.generate_batch(
+                texts,
+                exaggeration=exaggeration,
+                cfg_weight=cfg_weight,
+                temperature=temperature,
+                generator=generator
+            )
+        generation_time = time.time() - start_time
+        
+        results = []
+        for wav in wavs:
+            audio_np = wav.squeeze(0).numpy()
+            history_path = save_audio_to_history(audio_np, model.sr, "tts")
+            duration = len(audio_np) / model.sr
+            
+            status_msg = format_tts_status(
+                duration, generation_time, actual_seed, history_path,
+                exaggeration, cfg_weight, temperature
+            )
+            status_msg += f"\n📦 Batched with {len(texts) - 1} other request(s)"
+            results.append(((model.sr, audio_np), status_msg))
+        
+        return results
+        
+    except Exception as e:
+        return [(None, format_error("Generation failed", e))] * len(texts)
+    
+    finally:
+        release_cuda_cache()
+
+def generate_tts_batch(
+    texts: List[str],
+    reference_audios: list,
+    exaggerations: List[float],
+    cfg_weights: List[float],
+    temperatures: List[float],
+    seeds: List[int],
+    presets: List[str]
+) -> Tuple[list, List[str]]:
+    """Gradio batch handler: run concurrent compatible TTS requests as one batch"""
+    requests = list(zip(texts, reference_audios, exaggerations, cfg_weights, temperatures, seeds, presets))
+    results = [None] * len(requests)
+    
+    # Group unseeded, valid requests by voice and settings; everything else runs alone
+    groups = OrderedDict()
+    for i, (text, reference_audio, exaggeration, cfg_weight, temperature, seed, preset) in enumerate(requests):
+        if seed == 0 and validate_tts_text(text) is None:
+            settings = resolve_preset(preset, exaggeration, cfg_weight, temperature)
+            groups.setdefault((reference_audio, *settings), []).append(i)
+        else:
+            results[i] = generate_tts(*requests[i])
+    
+    for (reference_audio, *settings), indices in groups.items():
+        if len(indices) == 1:
+            results[indices[0]] = generate_tts(*requests[indices[0]])
+            continue
+        
+        group_results = generate_tts_group([texts[i] for i in indices], reference_audio, *settings)
+        for i, result in zip(indices, group_results):
+            results[i] = result
+    
+    return [audio for audio, _ in results], [status for _, status in results]
+
+# Preset configurations for different use cases
+_PRESET_CONFIGS = {
+    "Neutral": {"exaggeration": 0.5, "cfg_weight": 0.5, "temperature": 0.8},
+    "Calm & Controlled": {"exaggeration": 0.2, "cfg_weight": 0.7, "temperature": 0.6},
+    "Expressive & Dynamic": {"exaggeration": 0.8, "cfg_weight": 0.3, "temperature": 0.9},
+    "Dramatic & Intense": {"exaggeration": 1.2, "cfg_weight": 0.2, "temperature": 1.0},
+    "Robotic & Stable": {"exaggeration": 0.1, "cfg_weight": 0.8, "temperature": 0.5},
+    "Creative & Varied": {"exaggeration": 0.7, "cfg_weight": 0.4, "temperature": 1.2}
+}
+_PRESET_CHOICES = ["Custom"] + list(_PRESET_CONFIGS)
 
 def get_preset_configs() -> dict:
     """Get preset configurations for different use cases"""
-    return {
-        "Neutral": {"exaggeration": 0.5, "cfg_weight": 0.5, "temperature": 0.8},
-        "Calm & Controlled": {"exaggeration": 0.2, "cfg_weight": 0.7, "temperature": 0.6},
-        "Expressive & Dynamic": {"exaggeration": 0.8, "cfg_weight": 0.3, "temperature": 0.9},
-        "Dramatic & Intense": {"exaggeration": 1.2, "cfg_weight": 0.2, "temperature": 1.0},
-        "Robotic & Stable": {"exaggeration": 0.1, "cfg_weight": 0.8, "temperature": 0.5},
-        "Creative & Varied": {"exaggeration": 0.7, "cfg_weight": 0.4, "temperature": 1.2}
-    }
+    return _PRESET_CONFIGS
 
 def apply_preset(preset: str) -> Tuple[float, float, float]:
     """Apply preset configuration"""
     if preset == "Custom":
         return 0.5, 0.5, 0.8  # Default values
     
-    configs = get_preset_configs()
-    if preset in configs:
-        config = configs[preset]
+    config = _PRESET_CONFIGS.get(preset)
+    if config is not None:
         return config["exaggeration"], config["cfg_weight"], config["temperature"]
     
     return 0.5, 0.5, 0.8  # Fallback to default
@@ -264,6 +748,10 @@ def generate_vc(
     if input_audio is None:
         return None, "❌ Please provide input audio for voice conversion"
 
+    error = validate_vc_audio(input_audio)
+    if error:
+        return None, error
+
     # Load model if needed
     model, status = load_vc_model()
     if model is None:
@@ -272,10 +760,17 @@ def generate_vc(
     try:
         start_time = time.time()
 
-        wav = model.generate(
-            input_audio,
-            target_voice_path=target_voice_audio
-        )
+        def prepare(path):
+            model.set_target_voice(path)
+            return model.ref_dict
+
+        with torch.inference_mode():
+            # Reuse the target voice embedding for a known reference
+            if target_voice_audio is not None:
+                model.ref_dict = get_cached_reference("vc", target_voice_audio, prepare)
+            else:
+                model.ref_dict = vc_default_ref_dict
+            wav = model.generate(input_audio)
 
         generation_time = time.time() - start_time
 
@@ -294,80 +789,75 @@ def generate_vc(
         return (model.sr, audio_np), status_msg
 
     except Exception as e:
-        error_msg = f"❌ Voice conversion failed: {str(e)}\n\n"
-        error_msg += f"🔍 Debug info:\n{traceback.format_exc()}"
-        return None, error_msg
+        return None, format_error("Voice conversion failed", e)
+
+    finally:
+        release_cuda_cache()
 
 def get_audio_history() -> List[str]:
     """Get list of generated audio files"""
-    if not AUDIO_HISTORY_DIR.exists():
-        return []
-
-    audio_files = []
-    for file_path in AUDIO_HISTORY_DIR.glob("*.wav"):
-        audio_files.append(str(file_path))
-
-    return sorted(audio_files, reverse=True)  # Most recent first
+    with _history_lock:
+        return list(reversed(_history_index))  # Most recent first
+
+def _delete_history_files():
+    """Delete every indexed history file and empty the index"""
+    global _history_bytes
+    with _history_lock:
+        for file_path in _history_index:
+            Path(file_path).unlink(missing_ok=True)
+        _history_index.clear()
+        _history_bytes = 0
 
 def clear_audio_history() -> str:
     """Clear audio history directory"""
     try:
-        for file_path in AUDIO_HISTORY_DIR.glob("*.wav"):
-            file_path.unlink()
+        # Queued behind any pending writes on the single writer thread, so none
+        # of them can recreate a file after it has been deleted
+        _history_writer.submit(_delete_history_files).result()
         return "✅ Audio history cleared successfully"
     except Exception as e:
         return f"❌ Failed to clear history: {str(e)}"
 
-def get_system_status() -> str:
-    """Get comprehensive system status"""
-    status = []
-
-    # Device info
-    status.append("🖥️ SYSTEM INFORMATION")
-    status.append("=" * 40)
-    status.append(get_device_info())
-    status.append("")
-
-    # Model status
-    status.append("🤖 MODEL STATUS")
-    status.append("=" * 40)
+_MODEL_LOADED_TEMPLATE = (
+    "✅ {name} Model: Loaded\n"
+    "   📊 Sample rate: {model.sr} Hz\n"
+    "   🎯 Device: {model.device}"
+)
 
-    global tts_model, vc_model
-
-    if tts_model is not None:
-        status.append("✅ TTS Model: Loaded")
-        status.append(f"   📊 Sample rate: {tts_model.sr} Hz")
-        status.append(f"   🎯 Device: {tts_model.device}")
-    else:
-        status.append("❌ TTS Model: Not loaded")
-
-    if vc_model is not None:
-        status.append("✅ VC Model: Loaded")
-        status.append(f"   📊 Sample rate: {vc_model.sr} Hz")
-        status.append(f"   🎯 Device: {vc_model.device}")
-    else:
-        status.append("❌ VC Model: Not loaded")
+def _model_status(name: str, model) -> str:
+    """Status lines for one model"""
+    if model is None:
+        return f"❌ {name} Model: Not loaded"
+    return _MODEL_LOADED_TEMPLATE.format(name=name, model=model)
 
-    status.append("")
+def get_system_status() -> str:
+    """Get comprehensive system status"""
+    separator = "=" * 40
 
     # Audio history
     history_files = get_audio_history()
-    status.append("📁 AUDIO HISTORY")
-    status.append("=" * 40)
-    status.append(f"📊 Total files: {len(history_files)}")
-
     if history_files:
-        total_size = sum(Path(f).stat().st_size for f in history_files) / 1024 / 1024
-        status.append(f"📦 Total size: {total_size:.1f} MB")
-        status.append("📋 Recent files:")
-        for file_path in history_files[:5]:  # Show last 5 files
-            file_name = Path(file_path).name
-            file_size = Path(file_path).stat().st_size / 1024
-            status.append(f"   • {file_name} ({file_size:.1f} KB)")
+        recent = "\n".join(
+            f"   • {Path(file_path).name} ({_history_index.get(file_path, 0) / 1024:.1f} KB)"
+            for file_path in history_files[:5]  # Show last 5 files
+        )
+        history = (
+            f"📦 Total size: {_history_bytes / 1024 / 1024:.1f} MB\n"
+            f"📋 Recent files:\n{recent}"
+        )
     else:
-        status.append("📂 No audio files generated yet")
-
-    return "\n".join(status)
+        history = "📂 No audio files generated yet"
+
+    return (
+        f"🖥️ SYSTEM INFORMATION\n{separator}\n"
+        f"{get_device_info()}\n\n"
+        f"🤖 MODEL STATUS\n{separator}\n"
+        f"{_model_status('TTS', tts_model)}\n"
+        f"{_model_status('VC', vc_model)}\n\n"
+        f"📁 AUDIO HISTORY\n{separator}\n"
+        f"📊 Total files: {len(history_files)}\n"
+        f"{history}"
+    )
 
 # Sample texts for quick testing
 SAMPLE_TEXTS = [
@@ -378,23 +868,16 @@ SAMPLE_TEXTS = [
     "It was the best of times, it was the worst of times, it was the age of wisdom, it was the age of foolishness.",
     "Space: the final frontier. These are the voyages of the starship Enterprise, to boldly go where no one has gone before."
 ]
+_SAMPLE_CHOICES = ["Custom"] + [f"{i+1}. {text[:50]}..." for i, text in enumerate(SAMPLE_TEXTS)]
+_SAMPLE_TEXT_BY_CHOICE = dict(zip(_SAMPLE_CHOICES[1:], SAMPLE_TEXTS))
 
 def load_sample_text(sample_choice: str) -> str:
     """Load a sample text for quick testing"""
-    if sample_choice == "Custom":
-        return ""
-
-    try:
-        index = int(sample_choice.split(".")[0]) - 1
-        if 0 <= index < len(SAMPLE_TEXTS):
-            return SAMPLE_TEXTS[index]
-    except:
-        pass
-
-    return ""
+    return _SAMPLE_TEXT_BY_CHOICE.get(sample_choice, "")
 
 def create_gradio_interface():
     """Create the main Gradio interface"""
+    import gradio as gr
 
     # Custom CSS for better styling
     css = """
@@ -439,7 +922,7 @@ def create_gradio_interface():
 
                         # Sample text selector
                         sample_dropdown = gr.Dropdown(
-                            choices=["Custom"] + [f"{i+1}. {text[:50]}..." for i, text in enumerate(SAMPLE_TEXTS)],
+                            choices=_SAMPLE_CHOICES,
                             value="Custom",
                             label="Quick Sample Texts - Select a sample or choose 'Custom' to write your own"
                         )
@@ -450,7 +933,8 @@ def create_gradio_interface():
                             label=f"Text to Synthesize (Maximum {MAX_TEXT_LENGTH} characters)",
                             placeholder="Enter your text here...",
                             lines=4,
-                            max_lines=8
+                            max_lines=8,
+                            max_length=MAX_TEXT_LENGTH
                         )
 
                         # Reference audio for voice cloning
@@ -464,7 +948,7 @@ def create_gradio_interface():
 
                         # Preset selector
                         preset_dropdown = gr.Dropdown(
-                            choices=["Custom"] + list(get_preset_configs().keys()),
+                            choices=_PRESET_CHOICES,
                             value="Neutral",
                             label="Preset Configurations - Choose a preset or select 'Custom' for manual control"
                         )
@@ -489,12 +973,17 @@ def create_gradio_interface():
                                 label="Seed - Random seed (0 = random)"
                             )
 
-                        # Generate button
-                        tts_generate_btn = gr.Button(
-                            "🎵 Generate Speech",
-                            variant="primary",
-                            size="lg"
-                        )
+                        # Generate buttons
+                        with gr.Row():
+                            tts_generate_btn = gr.Button(
+                                "🎵 Generate Speech",
+                                variant="primary",
+                                size="lg"
+                            )
+                            tts_stream_btn = gr.Button(
+                                "🎧 Stream Speech",
+                                size="lg"
+                            )
 
                     with gr.Column(scale=1):
                         gr.Markdown("### 🔊 Generated Audio")
@@ -504,6 +993,13 @@ def create_gradio_interface():
                             label="Generated Speech",
                             show_download_button=True
                         )
+                        
+                        # Plays chunks as they arrive (🎧 Stream Speech)
+                        tts_stream_output = gr.Audio(
+                            label="Streamed Speech",
+                            streaming=True,
+                            autoplay=True
+                        )
 
                         # Status display
                         tts_status = gr.Textbox(
@@ -589,6 +1085,15 @@ def create_gradio_interface():
                             refresh_status_btn = gr.Button("🔄 Refresh Status", size="sm")
                             clear_history_btn = gr.Button("🗑️ Clear History", size="sm")
 
+                        with gr.Accordion("🔍 Show full traceback", open=False):
+                            traceback_box = gr.Textbox(
+                                label=f"Last errors ({ERROR_LOG_FILE})",
+                                lines=12,
+                                max_lines=30,
+                                interactive=False
+                            )
+                            load_traceback_btn = gr.Button("📜 Load Latest Errors", size="sm")
+
                     with gr.Column():
                         gr.Markdown("### 📁 Audio History")
 
@@ -634,7 +1139,7 @@ def create_gradio_interface():
         )
 
         tts_generate_btn.click(
-            fn=generate_tts,
+            fn=generate_tts_batch,
             inputs=[
                 text_input,
                 reference_audio,
@@ -644,7 +1149,23 @@ def create_gradio_interface():
                 seed_input,
                 preset_dropdown
             ],
-            outputs=[tts_audio_output, tts_status]
+            outputs=[tts_audio_output, tts_status],
+            batch=True,
+            max_batch_size=MAX_TTS_BATCH_SIZE
+        )
+
+        tts_stream_btn.click(
+            fn=generate_tts_stream,
+            inputs=[
+                text_input,
+                reference_audio,
+                exaggeration_slider,
+                cfg_weight_slider,
+                temperature_slider,
+                seed_input,
+                preset_dropdown
+            ],
+            outputs=[tts_stream_output, tts_status]
         )
 
         load_tts_btn.click(
@@ -654,9 +1175,9 @@ def create_gradio_interface():
         )
 
         clear_tts_btn.click(
-            fn=lambda: (None, ""),
+            fn=lambda: (None, None, ""),
             inputs=[],
-            outputs=[tts_audio_output, tts_status]
+            outputs=[tts_audio_output, tts_stream_output, tts_status]
         )
 
         # VC Events
@@ -691,6 +1212,12 @@ def create_gradio_interface():
             outputs=[system_status]
         )
 
+        load_traceback_btn.click(
+            fn=get_last_traceback,
+            inputs=[],
+            outputs=[traceback_box]
+        )
+
         # Load initial system status
         demo.load(
             fn=get_system_status,
@@ -12,12 +12,64 @@ Author: Resemble AI
 License: MIT
 """
 
+import io
+import time
+import queue
 import sys
+import threading
 import subprocess
 import importlib
+import importlib.metadata
+import importlib.util
 import platform
+import shutil
+import socket
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from _device import probe_device
+
+# Install status recorded by the checks, keyed by pip package name
+_INSTALLED = {}
+
+# Any one of these answering on 443 counts as being online
+_CONNECTIVITY_HOSTS = ("huggingface.co", "pypi.org", "1.1.1.1")
+
+# Upper bound for the whole connectivity check, DNS lookups included
+# (the connect timeout doesn't cover getaddrinfo)
+_CONNECTIVITY_DEADLINE = 5
+
+class _ThreadBufferedStdout:
+    """Route print() output from worker threads into per-thread buffers"""
+    
+    def __init__(self, stream):
+        self.stream = stream
+        self._local = threading.local()
+    
+    def write(self, text):
+        return getattr(self._local, "buffer", self.stream).write(text)
+    
+    def flush(self):
+        getattr(self._local, "buffer", self.stream).flush()
+    
+    def capture(self, func):
+        """Call func, returning its result and everything it printed"""
+        self._local.buffer = io.StringIO()
+        try:
+            return func(), self._local.buffer.getvalue()
+        finally:
+            del self._local.buffer
+
+def _present(name):
+    """Check that a module is installed without importing it"""
+    return importlib.util.find_spec(name) is not None
+
+def _pip_install_command():
+    """Command prefix that installs into this interpreter, using uv when available"""
+    if shutil.which("uv"):
+        return ["uv", "pip", "install", "--python", sys.executable]
+    return [sys.executable, "-m", "pip", "install"]
+
 def print_header():
     """Print a nice header for the setup check"""
     print("=" * 60)
@@ -38,19 +90,36 @@ def check_python_version():
         print("   ❌ Python 3.8+ required")
         return False
 
+def _module_version(import_name):
+    """Version of a module that has no dist metadata, or None if it isn't importable"""
+    if not _present(import_name):
+        return None
+    try:
+        module = importlib.import_module(import_name)
+    except ImportError:
+        return None
+    return getattr(module, '__version__', 'unknown')
+
 def check_package(package_name, import_name=None):
     """Check if a package is installed and importable"""
     if import_name is None:
         import_name = package_name
     
+    # Read the version from the installed metadata so heavy packages
+    # like torch aren't imported just to be checked
     try:
-        module = importlib.import_module(import_name)
-        version = getattr(module, '__version__', 'unknown')
-        print(f"   ✅ {package_name}: {version}")
-        return True
-    except ImportError:
+        version = importlib.metadata.version(package_name)
+    except importlib.metadata.PackageNotFoundError:
+        version = _module_version(import_name)
+    
+    if version is None:
         print(f"   ❌ {package_name}: Not installed")
+        _INSTALLED[package_name] = False
         return False
+    
+    print(f"   ✅ {package_name}: {version}")
+    _INSTALLED[package_name] = True
+    return True
 
 def check_dependencies():
     """Check all required dependencies"""
@@ -61,7 +130,8 @@ def check_dependencies():
         ("torchaudio", "torchaudio"), 
         ("librosa", "librosa"),
         ("numpy", "numpy"),
-        ("IPython", "IPython")
+        ("IPython", "IPython"),
+        ("chatterbox-tts", "chatterbox")
     ]
     
     all_good = True
@@ -71,34 +141,21 @@ def check_dependencies():
     
     return all_good
 
-def check_chatterbox():
-    """Check if ChatterBox TTS is installed"""
-    print("\n🤖 Checking ChatterBox TTS...")
-    try:
-        from chatterbox.tts import ChatterboxTTS
-        print("   ✅ ChatterBox TTS: Available")
-        return True
-    except ImportError:
-        print("   ❌ ChatterBox TTS: Not installed")
-        print("   💡 Run: pip install chatterbox-tts")
-        return False
-
 def check_device_support():
     """Check available compute devices"""
     print("\n💻 Checking device support...")
     
     try:
-        import torch
+        importlib.metadata.version("torch")
+        device, gpu_name, gpu_memory = probe_device()
         
         # Check CUDA
-        if torch.cuda.is_available():
-            gpu_name = torch.cuda.get_device_name(0)
-            gpu_memory = torch.cuda.get_device_properties(0).total_memory / 1e9
+        if device == "cuda":
             print(f"   🚀 CUDA GPU: {gpu_name} ({gpu_memory:.1f}GB)")
             return "cuda"
         
         # Check MPS (Apple Silicon)
-        elif torch.backends.mps.is_available():
+        elif device == "mps":
             print("   🍎 Apple MPS: Available")
             return "mps"
         
@@ -106,7 +163,7 @@ def check_device_support():
             print("   💻 CPU only: No GPU acceleration")
             return "cpu"
             
-    except ImportError:
+    except (importlib.metadata.PackageNotFoundError, ImportError):
         print("   ❌ Cannot check device support (PyTorch not available)")
         return None
 
@@ -115,7 +172,6 @@ def check_disk_space():
     print("\n💾 Checking disk space...")
     
     try:
-        import shutil
         free_space = shutil.disk_usage('.').free / 1e9
         print(f"   📊 Available space: {free_space:.1f}GB")
         
@@ -130,53 +186,65 @@ def check_disk_space():
         print(f"   ❌ Cannot check disk space: {e}")
         return False
 
+def _probe_host(host, results):
+    """Report whether a plain TCP connect to host:443 succeeds"""
+    try:
+        socket.create_connection((host, 443), 3).close()
+    except OSError:
+        results.put(False)
+    else:
+        results.put(True)
+
 def check_internet():
     """Check internet connectivity"""
     print("\n🌐 Checking internet connectivity...")
     
-    try:
-        import urllib.request
-        urllib.request.urlopen('https://huggingface.co', timeout=10)
+    # Race a plain TCP connect (no TLS or HTTP) to each host and stop at
+    # the first that answers, so one host failing DNS isn't reported as
+    # "no internet". The probes run on daemon threads: a losing probe
+    # stuck in DNS can't keep the script from exiting
+    results = queue.Queue()
+    for host in _CONNECTIVITY_HOSTS:
+        threading.Thread(target=_probe_host, args=(host, results), daemon=True).start()
+    
+    online = False
+    deadline = time.monotonic() + _CONNECTIVITY_DEADLINE
+    for _ in _CONNECTIVITY_HOSTS:
+        try:
+            if results.get(timeout=max(deadline - time.monotonic(), 0)):
+                online = True
+                break
+        except queue.Empty:
+            break
+    
+    if online:
         print("   ✅ Internet connection: Available")
         return True
-    except Exception:
+    else:
         print("   ❌ Internet connection: Not available")
         print("   💡 Enable internet in Kaggle notebook settings")
         return False
 
-def install_missing_packages():
+def install_missing_packages(installed):
     """Offer to install missing packages"""
     print("\n🔧 Installing missing packages...")
     
-    packages_to_install = []
-    
-    # Check if ChatterBox is missing
-    try:
-        import chatterbox
-    except ImportError:
-        packages_to_install.append("chatterbox-tts")
-    
-    # Check other packages
-    try:
-        import librosa
-    except ImportError:
-        packages_to_install.append("librosa")
-    
-    try:
-        import IPython
-    except ImportError:
-        packages_to_install.append("IPython")
+    # Decide from the check results instead of importing everything again
+    packages_to_install = [
+        package for package in ("chatterbox-tts", "librosa", "IPython")
+        if not installed.get(package)
+    ]
     
     if packages_to_install:
         print(f"   📥 Installing: {', '.join(packages_to_install)}")
-        for package in packages_to_install:
-            try:
-                subprocess.check_call([
-                    sys.executable, "-m", "pip", "install", package, "--quiet"
-                ])
-                print(f"   ✅ Installed: {package}")
-            except subprocess.CalledProcessError as e:
-                print(f"   ❌ Failed to install {package}: {e}")
+        # One pip run resolves and downloads everything together
+        try:
+            subprocess.check_call([
+                *_pip_install_command(), "--quiet", *packages_to_install
+            ])
+            print(f"   ✅ Installed: {', '.join(packages_to_install)}")
+        except subprocess.CalledProcessError as e:
+            print(f"   ❌ Failed to install {', '.join(packages_to_install)}: {e}")
     else:
         print("   ✅ All packages already installed")
 
@@ -208,22 +276,39 @@ def print_summary(results):
         if not results.get("Disk Space"):
             print("   • Free up disk space or use a different environment")
 
+def run_checks(checks):
+    """Run independent checks concurrently, printing their output in the given order"""
+    stdout = _ThreadBufferedStdout(sys.stdout)
+    sys.stdout = stdout
+    try:
+        with ThreadPoolExecutor(max_workers=len(checks)) as executor:
+            futures = [(name, executor.submit(stdout.capture, check)) for name, check in checks]
+    finally:
+        sys.stdout = stdout.stream
+    
+    results = {}
+    for name, future in futures:
+        ok, output = future.result()
+        sys.stdout.write(output)
+        results[name] = ok
+    return results
+
 def main():
     """Main setup check function"""
     print_header()
     
-    # Run all checks
-    results = {}
-    results["Python Version"] = check_python_version()
-    results["Dependencies"] = check_dependencies()
-    results["ChatterBox TTS"] = check_chatterbox()
-    results["Device Support"] = check_device_support() is not None
-    results["Disk Space"] = check_disk_space()
-    results["Internet"] = check_internet()
+    # Run all checks; the network and import probes overlap instead of adding up
+    results = run_checks([
+        ("Python Version", check_python_version),
+        ("Dependencies", check_dependencies),
+        ("Device Support", lambda: check_device_support() is not None),
+        ("Disk Space", check_disk_space),
+        ("Internet", check_internet),
+    ])
     
     # Offer to install missing packages
-    if not results["ChatterBox TTS"] or not results["Dependencies"]:
-        install_missing_packages()
+    if not results["Dependencies"]:
+        install_missing_packages(_INSTALLED)
     
     # Print summary
     print_summary(results)
@@ -20,11 +20,52 @@ Author: Resemble AI
 License: MIT
 """
 
+import re
 import sys
+import shlex
 import subprocess
 import argparse
+import functools
+import importlib.util
+import multiprocessing
 import os
-from pathlib import Path
+import shutil
+
+from _device import probe_device
+
+_REQUIREMENTS_FILE = "gradio_requirements.txt"
+
+# {package name: requirement spec} from _REQUIREMENTS_FILE, parsed on first use
+_REQS = None
+
+@functools.lru_cache(maxsize=1)
+def _cwd_files():
+    """Names in the working directory, read with a single scandir"""
+    with os.scandir('.') as entries:
+        return frozenset(entry.name for entry in entries)
+
+def read_requirements():
+    """Parse the requirements file once; empty if it doesn't exist"""
+    global _REQS
+    if _REQS is None:
+        _REQS = {}
+        if _REQUIREMENTS_FILE in _cwd_files():
+            with open(_REQUIREMENTS_FILE, "r") as f:
+                for line in f:
+                    spec = line.split("#", 1)[0].strip()
+                    if spec:
+                        _REQS[re.split(r"[<>=!~;\[ ]", spec)[0].lower()] = spec
+    return _REQS
+
+def _pip_install_command():
+    """Command prefix that installs into this interpreter, using uv when available"""
+    if shutil.which("uv"):
+        return ["uv", "pip", "install", "--python", sys.executable]
+    return [sys.executable, "-m", "pip", "install"]
+
+def _present(name):
+    """Check that a module is installed without importing it"""
+    return importlib.util.find_spec(name) is not None
 
 def check_dependencies():
     """Check if required dependencies are installed"""
@@ -38,11 +79,13 @@ def check_dependencies():
     
     missing_packages = []
     
+    # Look the packages up without importing them; right after
+    # --install-deps this would otherwise load torch and librosa just
+    # to confirm what pip already installed
     for package in required_packages:
-        try:
-            __import__(package)
+        if _present(package):
             print(f"✅ {package}")
-        except ImportError:
+        else:
             print(f"❌ {package} - Missing")
             missing_packages.append(package)
     
@@ -54,10 +97,10 @@ def install_dependencies():
     
     try:
         # Install from requirements file if it exists
-        if Path("gradio_requirements.txt").exists():
+        if _REQUIREMENTS_FILE in _cwd_files():
             subprocess.check_call([
-                sys.executable, "-m", "pip", "install", 
-                "-r", "gradio_requirements.txt"
+                *_pip_install_command(),
+                "-r", _REQUIREMENTS_FILE
             ])
         else:
             # Install core packages
@@ -70,11 +113,8 @@ def install_dependencies():
                 "chatterbox-tts"
             ]
             
-            for package in packages:
-                print(f"Installing {package}...")
-                subprocess.check_call([
-                    sys.executable, "-m", "pip", "install", package
-                ])
+            print(f"Installing {', '.join(packages)}...")
+            subprocess.check_call([*_pip_install_command(), *packages])
         
         print("✅ Dependencies installed successfully!")
         return True
@@ -85,31 +125,24 @@ def install_dependencies():
 
 def check_chatterbox():
     """Check if ChatterBox is properly installed"""
-    try:
-        from chatterbox.tts import ChatterboxTTS
-        from chatterbox.vc import ChatterboxVC
+    if _present("chatterbox"):
         print("✅ ChatterBox TTS & VC available")
         return True
-    except ImportError as e:
-        print(f"❌ ChatterBox not available: {e}")
-        print("💡 Try installing with: pip install chatterbox-tts")
-        return False
+    
+    print("❌ ChatterBox not available: package not installed")
+    print("💡 Try installing with: pip install chatterbox-tts")
+    return False
 
 def get_device_info():
     """Get device information"""
     try:
-        import torch
+        device, gpu_name, gpu_memory = probe_device()
         
-        if torch.cuda.is_available():
-            device = "cuda"
-            gpu_name = torch.cuda.get_device_name(0)
-            gpu_memory = torch.cuda.get_device_properties(0).total_memory / 1e9
+        if device == "cuda":
             print(f"🚀 CUDA GPU: {gpu_name} ({gpu_memory:.1f}GB)")
-        elif torch.backends.mps.is_available():
-            device = "mps"
+        elif device == "mps":
             print("🍎 Apple MPS available")
         else:
-            device = "cpu"
             print("💻 Using CPU (no GPU acceleration)")
         
         return device
@@ -118,8 +151,8 @@ def get_device_info():
         print("❌ PyTorch not available")
         return "cpu"
 
-def main():
-    """Main launcher function"""
+def build_parser():
+    """Build the launcher's command-line parser"""
     parser = argparse.ArgumentParser(
         description="Launch ChatterBox TTS & VC Gradio Interface",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -143,8 +176,24 @@ Examples:
                        help="Force CPU usage")
     parser.add_argument("--install-deps", action="store_true",
                        help="Install dependencies before running")
-    
-    args = parser.parse_args()
+    return parser
+
+def use_forkserver():
+    """Start later worker processes from a forkserver, before torch is loaded"""
+    # Workers forked from the server don't inherit CUDA state (which breaks
+    # plain fork) and skip the full re-import that spawn pays per worker.
+    # torch.multiprocessing and DataLoader workers pick this up as well.
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return  # Windows
+    try:
+        multiprocessing.set_start_method("forkserver")
+    except RuntimeError:
+        pass  # already chosen by the embedding program
+
+def main(argv=None):
+    """Main launcher function"""
+    args = build_parser().parse_args(argv)
+    use_forkserver()
     
     print("🎙️ ChatterBox TTS & VC Gradio Launcher")
     print("=" * 50)
@@ -161,7 +210,9 @@ Examples:
     if missing:
         print(f"\n❌ Missing packages: {', '.join(missing)}")
         print("💡 Run with --install-deps to install automatically")
-        print("💡 Or install manually: pip install -r gradio_requirements.txt")
+        requirements = read_requirements()
+        specs = [requirements.get(package, package) for package in missing]
+        print(f"💡 Or install manually: {shlex.join(['pip', 'install', *specs])}")
         sys.exit(1)
     
     # Check ChatterBox
@@ -188,7 +239,7 @@ Examples:
     
     try:
         # Import and run the enhanced app
-        if not Path("enhanced_gradio_app.py").exists():
+        if "enhanced_gradio_app.py" not in _cwd_files():
             print("❌ enhanced_gradio_app.py not found!")
             print("💡 Make sure you're running from the correct directory")
             sys.exit(1)
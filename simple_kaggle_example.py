@@ -12,44 +12,63 @@ Author: Resemble AI
 License: MIT
 """
 
+import os
 import sys
+import shutil
 import subprocess
+import importlib.util
 import time
-from pathlib import Path
+
+from _device import _torch, probe_device
+
+_TORCHAUDIO = None
+
+def _torchaudio():
+    """Import torchaudio on first use (it may only arrive with chatterbox-tts)"""
+    global _TORCHAUDIO
+    if _TORCHAUDIO is None:
+        import torchaudio
+        _TORCHAUDIO = torchaudio
+    return _TORCHAUDIO
+
+def _present(name):
+    """Check that a module is installed without importing it"""
+    return importlib.util.find_spec(name) is not None
+
+def _pip_install_command():
+    """Command prefix that installs into this interpreter, using uv when available"""
+    if shutil.which("uv"):
+        return ["uv", "pip", "install", "--python", sys.executable]
+    return [sys.executable, "-m", "pip", "install"]
 
 def install_chatterbox():
     """Install ChatterBox TTS if not already installed"""
-    try:
-        import chatterbox
+    if _present("chatterbox"):
         print("✅ ChatterBox TTS already installed")
         return True
-    except ImportError:
-        print("📥 Installing ChatterBox TTS...")
-        try:
-            subprocess.check_call([
-                sys.executable, "-m", "pip", "install", 
-                "chatterbox-tts", "--quiet"
-            ])
-            print("✅ ChatterBox TTS installed successfully")
-            return True
-        except subprocess.CalledProcessError as e:
-            print(f"❌ Failed to install ChatterBox TTS: {e}")
-            return False
+    
+    print("📥 Installing ChatterBox TTS...")
+    try:
+        subprocess.check_call([
+            *_pip_install_command(),
+            "chatterbox-tts", "--quiet"
+        ])
+        print("✅ ChatterBox TTS installed successfully")
+        return True
+    except subprocess.CalledProcessError as e:
+        print(f"❌ Failed to install ChatterBox TTS: {e}")
+        return False
 
 def detect_device():
     """Detect the best available device"""
     try:
-        import torch
+        device, gpu_name, _ = probe_device()
         
-        if torch.cuda.is_available():
-            device = "cuda"
-            gpu_name = torch.cuda.get_device_name(0)
+        if device == "cuda":
             print(f"🚀 Using CUDA GPU: {gpu_name}")
-        elif torch.backends.mps.is_available():
-            device = "mps"
+        elif device == "mps":
             print("🍎 Using Apple MPS")
         else:
-            device = "cpu"
             print("💻 Using CPU (no GPU available)")
         
         return device
@@ -79,39 +98,52 @@ def load_model(device):
         print(f"❌ Failed to load model: {e}")
         return None
 
-def generate_speech(model, text, filename="output.wav"):
-    """Generate speech from text"""
+def free_cuda_cache(model):
+    """Hand cached VRAM back between generations so it doesn't fragment"""
+    if model.device == "cuda":
+        _torch().cuda.empty_cache()
+
+def generate_examples(model, texts, filenames):
+    """Generate speech for several texts, returning the saved file paths"""
     try:
-        import torchaudio
-        
-        print(f"🎯 Generating speech: '{text[:50]}{'...' if len(text) > 50 else ''}'")
+        for text in texts:
+            print(f"🎯 Generating speech: '{text[:50]}{'...' if len(text) > 50 else ''}'")
         
         start_time = time.time()
-        wav = model.generate(text)
+        if hasattr(model, "generate_batch"):
+            # One batched decode for all texts instead of one per text
+            wavs = model.generate_batch(texts)
+        else:
+            # Older chatterbox-tts releases only generate one text at a time
+            with _torch().inference_mode():
+                wavs = [model.generate(text) for text in texts]
         generation_time = time.time() - start_time
         
-        # Save audio file
-        torchaudio.save(filename, wav, model.sr)
+        # Save audio files
+        for wav, filename in zip(wavs, filenames):
+            _torchaudio().save(filename, wav, model.sr)
+            print(f"💾 Saved to: {filename}")
         
         # Calculate stats
-        audio_duration = wav.shape[-1] / model.sr
+        audio_duration = sum(wav.shape[-1] for wav in wavs) / model.sr
         rtf = generation_time / audio_duration
         
+        del wavs
+        free_cuda_cache(model)
+        
         print(f"✅ Generated {audio_duration:.1f}s audio in {generation_time:.1f}s")
         print(f"📊 Real-time factor: {rtf:.2f}x")
-        print(f"💾 Saved to: {filename}")
         
-        return wav
+        return list(filenames)
         
     except Exception as e:
         print(f"❌ Generation failed: {e}")
-        return None
+        return []
 
 def demonstrate_voice_cloning(model):
-    """Demonstrate voice cloning with a reference"""
+    """Demonstrate voice cloning with a reference, returning the saved file paths"""
+    saved_files = []
     try:
-        import torchaudio
-        
         print("\n🎭 Voice Cloning Demonstration")
         
         # Generate reference audio
@@ -120,7 +152,9 @@ def demonstrate_voice_cloning(model):
         
         reference_wav = model.generate(reference_text)
         reference_file = "reference.wav"
-        torchaudio.save(reference_file, reference_wav, model.sr)
+        _torchaudio().save(reference_file, reference_wav, model.sr)
+        del reference_wav
+        saved_files.append(reference_file)
         print(f"💾 Reference saved: {reference_file}")
         
         # Clone voice with new text
@@ -134,14 +168,16 @@ def demonstrate_voice_cloning(model):
         )
         
         cloned_file = "cloned.wav"
-        torchaudio.save(cloned_file, cloned_wav, model.sr)
+        _torchaudio().save(cloned_file, cloned_wav, model.sr)
+        del cloned_wav
+        free_cuda_cache(model)
+        saved_files.append(cloned_file)
         print(f"💾 Cloned voice saved: {cloned_file}")
         
-        return True
-        
     except Exception as e:
         print(f"❌ Voice cloning failed: {e}")
-        return False
+    
+    return saved_files
 
 def main():
     """Main demonstration function"""
@@ -175,23 +211,22 @@ def main():
         "ChatterBox can generate natural-sounding speech from any text."
     ]
     
-    # Generate speech for each example
-    for i, text in enumerate(examples, 1):
-        filename = f"example_{i}.wav"
-        wav = generate_speech(model, text, filename)
-        if wav is not None:
-            print(f"🔊 Audio saved: {filename}")
-        print()
+    # Generate speech for all examples together
+    filenames = [f"example_{i}.wav" for i in range(1, len(examples) + 1)]
+    wav_files = generate_examples(model, examples, filenames)
+    for filename in wav_files:
+        print(f"🔊 Audio saved: {filename}")
+    print()
     
     # Demonstrate voice cloning
-    demonstrate_voice_cloning(model)
+    wav_files += demonstrate_voice_cloning(model)
     
-    # List generated files
+    # List generated files (only the ones written above; the working
+    # directory may hold many unrelated files)
     print("\n📁 Generated Files:")
-    wav_files = list(Path('.').glob('*.wav'))
     for file_path in wav_files:
-        file_size = file_path.stat().st_size / 1024
-        print(f"   📄 {file_path.name} ({file_size:.1f} KB)")
+        file_size = os.path.getsize(file_path) / 1024
+        print(f"   📄 {file_path} ({file_size:.1f} KB)")
     
     print(f"\n✨ Generated {len(wav_files)} audio files!")
     print("\n💡 Tips:")
@@ -2,6 +2,7 @@
 # Author: John Meade, Jeremy Hsu
 # MIT License
 import logging
+import threading
 import torch
 from dataclasses import dataclass
 from types import MethodType
@@ -9,6 +10,9 @@ from types import MethodType
 
 logger = logging.getLogger(__name__)
 
+# Guards the shared forward patch on the alignment layer; concurrent generations each add an analyzer
+_attention_spy_lock = threading.Lock()
+
 
 @dataclass
 class AlignmentAnalysisResult:
@@ -75,16 +79,40 @@ class AlignmentStreamAnalyzer:
             self.last_aligned_attn = step_attention[0].mean(0) # (N, N)
 
         target_layer = tfmr.layers[alignment_layer_idx].self_attn
-        hook_handle = target_layer.register_forward_hook(attention_forward_hook)
-
-        # Backup original forward
-        original_forward = target_layer.forward
-        def patched_forward(self, *args, **kwargs):
-            kwargs['output_attentions'] = True
-            return original_forward(*args, **kwargs)
-
-        # TODO: how to unpatch it?
-        target_layer.forward = MethodType(patched_forward, target_layer)
+        self._hook_handle = target_layer.register_forward_hook(attention_forward_hook)
+
+        # The forward patch is shared by all live analyzers on the layer: the first one installs it (backing up the
+        # original forward) and the last one to be removed restores it, whatever order they finish in
+        with _attention_spy_lock:
+            spy = getattr(target_layer, "_attention_spy", None)  # [original forward, live analyzers]
+            if spy is None:
+                original_forward = target_layer.forward
+                def patched_forward(self, *args, **kwargs):
+                    kwargs['output_attentions'] = True
+                    return original_forward(*args, **kwargs)
+
+                target_layer.forward = MethodType(patched_forward, target_layer)
+                spy = target_layer._attention_spy = [original_forward, 0]
+            spy[1] += 1
+        self._target_layer = target_layer
+        self._removed = False
+
+    def remove(self):
+        """
+        Removes the attention hook and, once no other analyzer uses the layer, restores its original forward.
+        Without this, every inference call stacks another hook (and another device->host copy per decoding step)
+        onto the layer.
+        """
+        if self._removed:
+            return
+        self._removed = True
+        self._hook_handle.remove()
+        with _attention_spy_lock:
+            spy = self._target_layer._attention_spy
+            spy[1] -= 1
+            if spy[1] == 0:
+                self._target_layer.forward = spy[0]
+                del self._target_layer._attention_spy
 
     def step(self, logits):
         """
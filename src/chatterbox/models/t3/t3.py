@@ -17,6 +17,7 @@ from .modules.t3_config import T3Config
 from .llama_configs import LLAMA_CONFIGS
 from .inference.t3_hf_backend import T3HuggingfaceBackend
 from .inference.alignment_stream_analyzer import AlignmentStreamAnalyzer
+from .inference.cuda_graph_decoder import T3CudaGraphDecoder
 
 
 logger = logging.getLogger(__name__)
@@ -69,11 +70,29 @@ class T3(nn.Module):
         self.text_head = nn.Linear(self.cfg.hidden_size, hp.text_tokens_dict_size, bias=False)
         self.speech_head = nn.Linear(self.cfg.hidden_size, hp.speech_tokens_dict_size, bias=False)
         self.compiled = False
+        self.cuda_graph_decoder = None
 
     @property
     def device(self):
         return self.speech_head.weight.device
 
+    @property
+    def dtype(self):
+        return self.speech_head.weight.dtype
+
+    def enable_cuda_graphs(self, max_cache_len=2048):
+        """
+        Decode CFG inference (batch of 2) through a captured CUDA graph over a static KV cache. CUDA only; prompts
+        that don't fit in `max_cache_len` fall back to the eager loop, as do generations that start while another
+        one is using the graph (there is a single static cache). Skips the alignment analyzer, whose hook copies
+        attention maps to the host every step.
+        """
+        assert self.device.type == "cuda", "CUDA graphs require a CUDA device"
+        self.cuda_graph_decoder = T3CudaGraphDecoder(self.tfmr, self.speech_head, batch_size=2, max_cache_len=max_cache_len)
+
+    def disable_cuda_graphs(self):
+        self.cuda_graph_decoder = None
+
     def prepare_conditioning(self, t3_cond: T3Cond):
         """
         Token cond data needs to be embedded, so that needs to be here instead of in `T3CondEnc`.
@@ -207,7 +226,14 @@ class T3(nn.Module):
         return loss_text, loss_speech
 
     @torch.inference_mode()
-    def inference(
+    def inference(self, **kwargs):
+        """
+        Runs `inference_stream` to completion; returns the sampled speech tokens, shape (B, num_tokens).
+        """
+        return torch.cat(list(self.inference_stream(**kwargs)), dim=1)
+
+    @torch.inference_mode()
+    def inference_stream(
         self,
         *,
         t3_cond: T3Cond,
@@ -227,8 +253,11 @@ class T3(nn.Module):
         length_penalty=1.0,
         repetition_penalty=2.0,
         cfg_weight=0,
+        generator: Optional[torch.Generator]=None,
     ):
         """
+        Yields each sampled speech token, shape (B, 1), as soon as it is decoded; the stop token is the last one.
+
         Args:
             text_tokens: a 1D (unbatched) or 2D (batched) tensor.
         """
@@ -308,74 +337,236 @@ class T3(nn.Module):
 
         # Track generated token ids; start with the BOS token.
         generated_ids = bos_token.clone()
-        predicted = []  # To store the predicted tokens
 
         # Instantiate the logits processors.
         top_p_warper = TopPLogitsWarper(top_p=top_p)
         repetition_penalty_processor = RepetitionPenaltyLogitsProcessor(penalty=repetition_penalty)
 
-        # ---- Initial Forward Pass (no kv_cache yet) ----
-        output = self.patched_model(
+        graph_decoder = self.cuda_graph_decoder
+        if graph_decoder is not None and not graph_decoder.fits(inputs_embeds, max_new_tokens):
+            graph_decoder = None
+        # One static KV cache per model: a concurrent generation would overwrite it mid-decode, so whoever finds
+        # it taken decodes eagerly instead of waiting. Held until the last token, released in `finally`.
+        if graph_decoder is not None and not graph_decoder.lock.acquire(blocking=False):
+            graph_decoder = None
+
+        # The analyzer must come off the layer (and the graph lock be released) even if the caller stops
+        # consuming tokens early
+        try:
+            if graph_decoder is not None:
+                # the captured step can't run the analyzer's host-syncing attention hook
+                alignment_stream_analyzer.remove()
+                patched_model.alignment_stream_analyzer = None
+
+            # ---- Initial Forward Pass (no kv_cache yet) ----
+            if graph_decoder is not None:
+                step_logits = graph_decoder.prefill(inputs_embeds)
+            else:
+                # Only the analyzer's layer needs attention maps and it forces them itself; asking the whole
+                # model for them would drop every layer from SDPA to the manual softmax(QK^T)V path
+                output = patched_model(
+                    inputs_embeds=inputs_embeds,
+                    past_key_values=None,
+                    use_cache=True,
+                    output_attentions=False,
+                    output_hidden_states=True,
+                    return_dict=True,
+                )
+                # Initialize kv_cache with the full context.
+                past = output.past_key_values
+                step_logits = output.logits[:, -1, :]
+
+            # ---- Generation Loop using kv_cache ----
+            for i in tqdm(range(max_new_tokens), desc="Sampling", dynamic_ncols=True):
+                # CFG and sampling run in fp32 whatever precision the transformer uses
+                logits = step_logits.float()
+
+                # CFG
+                if cfg_weight > 0.0:
+                    logits_cond = logits[0:1]
+                    logits_uncond = logits[1:2]
+                    logits = logits_cond + cfg_weight * (logits_cond - logits_uncond)
+
+                logits = logits.squeeze(1)
+
+                # Apply temperature scaling.
+                if temperature != 1.0:
+                    logits = logits / temperature
+
+                # Apply repetition penalty and top‑p filtering.
+                logits = repetition_penalty_processor(generated_ids, logits)
+                logits = top_p_warper(None, logits)
+
+                # Convert logits to probabilities and sample the next token.
+                probs = torch.softmax(logits, dim=-1)
+                next_token = torch.multinomial(probs, num_samples=1, generator=generator)  # shape: (B, 1)
+
+                yield next_token
+                generated_ids = torch.cat([generated_ids, next_token], dim=1)
+
+                # Check for EOS token.
+                if next_token.view(-1) == self.hp.stop_speech_token:
+                    break
+
+                # Get embedding for the new token.
+                next_token_embed = self.speech_emb(next_token)
+                next_token_embed = next_token_embed + self.speech_pos_emb.get_fixed_embedding(i + 1)
+
+                #  For CFG
+                if cfg_weight > 0.0:
+                    next_token_embed = torch.cat([next_token_embed, next_token_embed])
+
+                # Forward pass with only the new token and the cached past.
+                if graph_decoder is not None:
+                    step_logits = graph_decoder.step(next_token_embed)
+                    continue
+                output = patched_model(
+                    inputs_embeds=next_token_embed,
+                    past_key_values=past,
+                    output_attentions=False,
+                    output_hidden_states=True,
+                    return_dict=True,
+                )
+                # Update the kv_cache.
+                past = output.past_key_values
+                step_logits = output.logits[:, -1, :]
+        finally:
+            if graph_decoder is None:
+                alignment_stream_analyzer.remove()
+            else:
+                graph_decoder.lock.release()
+
+    @torch.inference_mode()
+    def inference_batch(
+        self,
+        *,
+        t3_cond: T3Cond,
+        text_tokens: List[Tensor],
+        max_new_tokens=1000,
+        temperature=0.8,
+        top_p=0.8,
+        repetition_penalty=2.0,
+        cfg_weight=0,
+        generator: Optional[torch.Generator]=None,
+    ):
+        """
+        Batched variant of `inference` for several texts sharing one conditioning.
+
+        Sequences are left-padded so every row decodes its next token at the same step; the
+        attention mask hides the padding and position ids keep RoPE positions contiguous.
+
+        Args:
+            text_tokens: list of 1D tensors, each already wrapped in start / stop text tokens.
+        Returns:
+            list of 1D tensors of predicted speech tokens, each cut after its first stop token.
+        """
+        for tokens in text_tokens:
+            _ensure_BOT_EOT(tokens[None], self.hp)
+
+        device = self.device
+        n = len(text_tokens)
+        use_cfg = cfg_weight > 0.0
+
+        cond_emb = self.prepare_conditioning(t3_cond)[0]  # (len_cond, dim)
+
+        bos_token = torch.tensor([[self.hp.start_speech_token]], dtype=torch.long, device=device)
+        bos_embed = self.speech_emb(bos_token)[0] + self.speech_pos_emb(bos_token)  # (1, dim)
+
+        # Build each row's unpadded prompt: [cond | text | bos], with the uncond CFG rows
+        # (zeroed text embeddings) appended after all the cond rows
+        rows = []
+        for uncond in ([False, True] if use_cfg else [False]):
+            for tokens in text_tokens:
+                tokens = tokens.to(dtype=torch.long, device=device)
+                text_emb = self.text_emb(tokens)
+                if uncond:
+                    text_emb = torch.zeros_like(text_emb)
+                if self.hp.input_pos_emb == "learned":
+                    text_emb = text_emb + self.text_pos_emb(tokens[None])
+                parts = [cond_emb, text_emb, bos_embed]
+                if use_cfg:
+                    # Matches `inference`, which appends a second BOS for CFG
+                    parts.append(bos_embed)
+                rows.append(torch.cat(parts))
+
+        # Left-pad to a common length
+        max_len = max(row.size(0) for row in rows)
+        inputs_embeds = rows[0].new_zeros(len(rows), max_len, self.dim)
+        attention_mask = torch.zeros(len(rows), max_len, dtype=torch.long, device=device)
+        for i, row in enumerate(rows):
+            inputs_embeds[i, max_len - row.size(0):] = row
+            attention_mask[i, max_len - row.size(0):] = 1
+        position_ids = (attention_mask.cumsum(-1) - 1).clamp(min=0)
+
+        generated_ids = bos_token.expand(n, 1).clone()
+        finished = torch.zeros(n, dtype=torch.bool, device=device)
+        predicted = []
+
+        top_p_warper = TopPLogitsWarper(top_p=top_p)
+        repetition_penalty_processor = RepetitionPenaltyLogitsProcessor(penalty=repetition_penalty)
+
+        output = self.tfmr(
             inputs_embeds=inputs_embeds,
+            attention_mask=attention_mask,
+            position_ids=position_ids,
             past_key_values=None,
             use_cache=True,
-            output_attentions=True,
-            output_hidden_states=True,
             return_dict=True,
         )
-        # Initialize kv_cache with the full context.
         past = output.past_key_values
 
-        # ---- Generation Loop using kv_cache ----
         for i in tqdm(range(max_new_tokens), desc="Sampling", dynamic_ncols=True):
-            logits = output.logits[:, -1, :]
+            # CFG and sampling run in fp32 whatever precision the transformer uses
+            logits = self.speech_head(output.last_hidden_state[:, -1, :]).float()  # (rows, vocab)
 
             # CFG
-            if cfg_weight > 0.0:
-                logits_cond = logits[0:1]
-                logits_uncond = logits[1:2]
+            if use_cfg:
+                logits_cond = logits[:n]
+                logits_uncond = logits[n:]
                 logits = logits_cond + cfg_weight * (logits_cond - logits_uncond)
 
-            logits = logits.squeeze(1)
-
-            # Apply temperature scaling.
             if temperature != 1.0:
                 logits = logits / temperature
 
-            # Apply repetition penalty and top‑p filtering.
             logits = repetition_penalty_processor(generated_ids, logits)
             logits = top_p_warper(None, logits)
 
-            # Convert logits to probabilities and sample the next token.
             probs = torch.softmax(logits, dim=-1)
-            next_token = torch.multinomial(probs, num_samples=1)  # shape: (B, 1)
+            next_token = torch.multinomial(probs, num_samples=1, generator=generator)  # (n, 1)
 
+            # Rows that already stopped keep emitting the stop token as padding
+            next_token = next_token.masked_fill(finished[:, None], self.hp.stop_speech_token)
             predicted.append(next_token)
             generated_ids = torch.cat([generated_ids, next_token], dim=1)
 
-            # Check for EOS token.
-            if next_token.view(-1) == self.hp.stop_speech_token:
+            finished |= next_token.view(-1) == self.hp.stop_speech_token
+            if finished.all():
                 break
 
-            # Get embedding for the new token.
             next_token_embed = self.speech_emb(next_token)
             next_token_embed = next_token_embed + self.speech_pos_emb.get_fixed_embedding(i + 1)
-
-            #  For CFG
-            if cfg_weight > 0.0:
+            if use_cfg:
                 next_token_embed = torch.cat([next_token_embed, next_token_embed])
 
-            # Forward pass with only the new token and the cached past.
-            output = self.patched_model(
+            attention_mask = torch.cat([attention_mask, attention_mask.new_ones(len(rows), 1)], dim=1)
+            position_ids = position_ids[:, -1:] + 1
+
+            output = self.tfmr(
                 inputs_embeds=next_token_embed,
+                attention_mask=attention_mask,
+                position_ids=position_ids,
                 past_key_values=past,
-                output_attentions=True,
-                output_hidden_states=True,
+                use_cache=True,
                 return_dict=True,
             )
-            # Update the kv_cache.
             past = output.past_key_values
 
-        # Concatenate all predicted tokens along the sequence dimension.
-        predicted_tokens = torch.cat(predicted, dim=1)  # shape: (B, num_tokens)
-        return predicted_tokens
+        predicted_tokens = torch.cat(predicted, dim=1)  # (n, num_tokens)
+
+        # Cut each row after its first stop token, like the unbatched `inference`
+        results = []
+        for row in predicted_tokens:
+            stops = (row == self.hp.stop_speech_token).nonzero(as_tuple=True)[0]
+            end = stops[0].item() + 1 if len(stops) > 0 else row.size(0)
+            results.append(row[:end])
+        return results
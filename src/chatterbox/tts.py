@@ -1,12 +1,15 @@
 from dataclasses import dataclass
+from itertools import islice
 from pathlib import Path
 
 import librosa
+import numpy as np
 import torch
 import perth
 import torch.nn.functional as F
 from huggingface_hub import hf_hub_download
 from safetensors.torch import load_file
+from transformers.modeling_utils import no_init_weights
 
 from .models.t3 import T3
 from .models.s3tokenizer import S3_SR, drop_invalid_tokens
@@ -135,13 +138,16 @@ class ChatterboxTTS:
         else:
             map_location = None
 
-        ve = VoiceEncoder()
+        # Both are fully overwritten by the strict loads below, so skip their random init
+        with no_init_weights():
+            ve = VoiceEncoder()
+            t3 = T3()
+
         ve.load_state_dict(
             load_file(ckpt_dir / "ve.safetensors")
         )
         ve.to(device).eval()
 
-        t3 = T3()
         t3_state = load_file(ckpt_dir / "t3_cfg.safetensors")
         if "model" in t3_state.keys():
             t3_state = t3_state["model"][0]
@@ -165,7 +171,7 @@ class ChatterboxTTS:
         return cls(t3, s3gen, ve, tokenizer, device, conds=conds)
 
     @classmethod
-    def from_pretrained(cls, device) -> 'ChatterboxTTS':
+    def from_pretrained(cls, device, local_files_only=False) -> 'ChatterboxTTS':
         # Check if MPS is available on macOS
         if device == "mps" and not torch.backends.mps.is_available():
             if not torch.backends.mps.is_built():
@@ -175,7 +181,7 @@ class ChatterboxTTS:
             device = "cpu"
 
         for fpath in ["ve.safetensors", "t3_cfg.safetensors", "s3gen.safetensors", "tokenizer.json", "conds.pt"]:
-            local_path = hf_hub_download(repo_id=REPO_ID, filename=fpath)
+            local_path = hf_hub_download(repo_id=REPO_ID, filename=fpath, local_files_only=local_files_only)
 
         return cls.from_local(Path(local_path).parent, device)
 
@@ -205,20 +211,7 @@ class ChatterboxTTS:
         ).to(device=self.device)
         self.conds = Conditionals(t3_cond, s3gen_ref_dict)
 
-    def generate(
-        self,
-        text,
-        audio_prompt_path=None,
-        exaggeration=0.5,
-        cfg_weight=0.5,
-        temperature=0.8,
-    ):
-        if audio_prompt_path:
-            self.prepare_conditionals(audio_prompt_path, exaggeration=exaggeration)
-        else:
-            assert self.conds is not None, "Please `prepare_conditionals` first or specify `audio_prompt_path`"
-
-        # Update exaggeration if needed
+    def _update_exaggeration(self, exaggeration):
         if exaggeration != self.conds.t3.emotion_adv[0, 0, 0]:
             _cond: T3Cond = self.conds.t3
             self.conds.t3 = T3Cond(
@@ -227,6 +220,7 @@ class ChatterboxTTS:
                 emotion_adv=exaggeration * torch.ones(1, 1, 1),
             ).to(device=self.device)
 
+    def _prepare_text_tokens(self, text, cfg_weight):
         # Norm and tokenize text
         text = punc_norm(text)
         text_tokens = self.tokenizer.text_to_tokens(text).to(self.device)
@@ -238,15 +232,41 @@ class ChatterboxTTS:
         eot = self.t3.hp.stop_text_token
         text_tokens = F.pad(text_tokens, (1, 0), value=sot)
         text_tokens = F.pad(text_tokens, (0, 1), value=eot)
+        return text_tokens
+
+    def generate(
+        self,
+        text,
+        audio_prompt_path=None,
+        exaggeration=0.5,
+        cfg_weight=0.5,
+        temperature=0.8,
+        generator=None,
+    ):
+        if audio_prompt_path:
+            self.prepare_conditionals(audio_prompt_path, exaggeration=exaggeration)
+        else:
+            assert self.conds is not None, "Please `prepare_conditionals` first or specify `audio_prompt_path`"
 
+        self._update_exaggeration(exaggeration)
+        text_tokens = self._prepare_text_tokens(text, cfg_weight)
+
+        # If T3 was cast to half precision, autocast so the fp32 conditionals match its weights
+        t3_dtype = self.t3.dtype
         with torch.inference_mode():
-            speech_tokens = self.t3.inference(
-                t3_cond=self.conds.t3,
-                text_tokens=text_tokens,
-                max_new_tokens=1000,  # TODO: use the value in config
-                temperature=temperature,
-                cfg_weight=cfg_weight,
-            )
+            with torch.autocast(
+                device_type=self.t3.device.type,
+                dtype=t3_dtype,
+                enabled=t3_dtype in (torch.float16, torch.bfloat16),
+            ):
+                speech_tokens = self.t3.inference(
+                    t3_cond=self.conds.t3,
+                    text_tokens=text_tokens,
+                    max_new_tokens=1000,  # TODO: use the value in config
+                    temperature=temperature,
+                    cfg_weight=cfg_weight,
+                    generator=generator,
+                )
             # Extract only the conditional batch.
             speech_tokens = speech_tokens[0]
 
@@ -263,4 +283,161 @@ class ChatterboxTTS:
             )
             wav = wav.squeeze(0).detach().cpu().numpy()
             watermarked_wav = self.watermarker.apply_watermark(wav, sample_rate=self.sr)
-        return torch.from_numpy(watermarked_wav).unsqueeze(0)
\ No newline at end of file
+        return torch.from_numpy(watermarked_wav).unsqueeze(0)
+
+    @torch.inference_mode()
+    def generate_stream(
+        self,
+        text,
+        audio_prompt_path=None,
+        exaggeration=0.5,
+        cfg_weight=0.5,
+        temperature=0.8,
+        chunk_tokens=25,
+        context_tokens=10,
+        fade_ms=20,
+        generator=None,
+    ):
+        """
+        Like `generate`, but yields (1, num_samples) waveform chunks while T3 is still decoding.
+
+        Every `chunk_tokens` speech tokens (25 Hz, so the default is ~1s of audio) a window of tokens is vocoded and
+        only the new audio is emitted. The window starts `context_tokens` before the first token not yet emitted, so
+        each pass costs about the same however long the clip gets. The flow decoder is causal with fixed noise, so
+        with that context the overlapping audio barely moves between passes; the last `fade_ms` of each chunk is
+        held back and crossfaded with the next pass to hide seams.
+        """
+        if audio_prompt_path:
+            self.prepare_conditionals(audio_prompt_path, exaggeration=exaggeration)
+        else:
+            assert self.conds is not None, "Please `prepare_conditionals` first or specify `audio_prompt_path`"
+
+        self._update_exaggeration(exaggeration)
+        text_tokens = self._prepare_text_tokens(text, cfg_weight)
+
+        fade_len = int(self.sr * fade_ms / 1000)
+        fade_in = np.linspace(0.0, 1.0, fade_len, dtype=np.float32)
+        samples_per_token = self.sr // 25  # speech tokens are 25 Hz
+        emitted = 0  # samples of the clip already yielded
+        tail = None  # held-back end of the previous pass, to crossfade into the next
+        predicted = []
+
+        # inference_mode is applied per resume by the decorator; a `with` block can't span yields
+        # when the consumer resumes this generator from different threads (as Gradio does)
+        t3_dtype = self.t3.dtype
+        token_stream = self.t3.inference_stream(
+            t3_cond=self.conds.t3,
+            text_tokens=text_tokens,
+            max_new_tokens=1000,  # TODO: use the value in config
+            temperature=temperature,
+            cfg_weight=cfg_weight,
+            generator=generator,
+        )
+        while True:
+            # Only T3 runs under autocast; the vocoder stays in its own precision
+            with torch.autocast(
+                device_type=self.t3.device.type,
+                dtype=t3_dtype,
+                enabled=t3_dtype in (torch.float16, torch.bfloat16),
+            ):
+                new_tokens = list(islice(token_stream, chunk_tokens))
+            predicted.extend(new_tokens)
+            finished = len(new_tokens) < chunk_tokens
+
+            # Extract only the conditional batch.
+            speech_tokens = drop_invalid_tokens(torch.cat(predicted, dim=1)[0])
+            speech_tokens = speech_tokens[speech_tokens < 6561].to(self.device)
+            if len(speech_tokens) == 0:
+                if finished:
+                    break
+                continue
+
+            # Vocode only the tokens behind the unemitted audio plus some context; `offset` is where the
+            # window's audio starts in the clip. The context also keeps the window's faded-in start (trim_fade)
+            # out of the emitted audio.
+            start = max(0, emitted // samples_per_token - context_tokens)
+            offset = start * samples_per_token
+
+            # Until the end, the flow model drops its lookahead frames (finalize=False)
+            wav, _ = self.s3gen.inference(
+                speech_tokens=speech_tokens[start:],
+                ref_dict=self.conds.gen,
+                finalize=finished,
+            )
+            wav = wav.squeeze(0).detach().cpu().numpy()
+
+            # Positions within this window's audio
+            begin = emitted - offset
+            end = len(wav) if finished else len(wav) - fade_len
+            chunk = wav[begin:max(end, begin)].copy()
+            if tail is not None:
+                n = min(len(tail), len(chunk))
+                chunk[:n] = tail[:n] * (1.0 - fade_in[:n]) + chunk[:n] * fade_in[:n]
+                if n < len(tail) and finished:
+                    # the final pass came out shorter than the held-back audio
+                    chunk = np.concatenate([chunk, tail[n:]])
+            if not finished and end > begin:
+                tail = wav[end:]
+                emitted = offset + end
+
+            if len(chunk):
+                watermarked_chunk = self.watermarker.apply_watermark(chunk, sample_rate=self.sr)
+                yield torch.from_numpy(watermarked_chunk).unsqueeze(0)
+            if finished:
+                break
+
+    def generate_batch(
+        self,
+        texts,
+        exaggeration=0.5,
+        cfg_weight=0.5,
+        temperature=0.8,
+        generator=None,
+    ):
+        """
+        Generate several texts in one batched T3 decode, all using the current `conds`.
+        Returns a list of (1, num_samples) waveforms in the same order as `texts`.
+        """
+        assert self.conds is not None, "Please `prepare_conditionals` first"
+        self._update_exaggeration(exaggeration)
+
+        sot = self.t3.hp.start_text_token
+        eot = self.t3.hp.stop_text_token
+        text_tokens = []
+        for text in texts:
+            tokens = self.tokenizer.text_to_tokens(punc_norm(text))[0].to(self.device)
+            tokens = F.pad(tokens, (1, 0), value=sot)
+            tokens = F.pad(tokens, (0, 1), value=eot)
+            text_tokens.append(tokens)
+
+        t3_dtype = self.t3.dtype
+        wavs = []
+        with torch.inference_mode():
+            with torch.autocast(
+                device_type=self.t3.device.type,
+                dtype=t3_dtype,
+                enabled=t3_dtype in (torch.float16, torch.bfloat16),
+            ):
+                batch_speech_tokens = self.t3.inference_batch(
+                    t3_cond=self.conds.t3,
+                    text_tokens=text_tokens,
+                    max_new_tokens=1000,  # TODO: use the value in config
+                    temperature=temperature,
+                    cfg_weight=cfg_weight,
+                    generator=generator,
+                )
+
+            # The vocoder runs per item since output lengths differ
+            for speech_tokens in batch_speech_tokens:
+                speech_tokens = drop_invalid_tokens(speech_tokens)
+                speech_tokens = speech_tokens[speech_tokens < 6561]
+                speech_tokens = speech_tokens.to(self.device)
+
+                wav, _ = self.s3gen.inference(
+                    speech_tokens=speech_tokens,
+                    ref_dict=self.conds.gen,
+                )
+                wav = wav.squeeze(0).detach().cpu().numpy()
+                watermarked_wav = self.watermarker.apply_watermark(wav, sample_rate=self.sr)
+                wavs.append(torch.from_numpy(watermarked_wav).unsqueeze(0))
+        return wavs
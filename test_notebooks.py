@@ -9,176 +9,363 @@ This script validates both Kaggle and Colab notebooks to ensure they:
 - Have correct metadata for their respective platforms
 
 Usage:
-    python test_notebooks.py
+    python test_notebooks.py [--strict]
+
+    --strict  Also run nbformat's full schema validation (needs nbformat)
 """
 
+import io
+import os
+import re
 import json
+import mmap
 import sys
-from pathlib import Path
+import argparse
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 
-def test_notebook_structure(notebook_path, platform):
-    """Test notebook structure and content"""
-    print(f"🧪 Testing {platform} Notebook")
-    print("=" * 40)
+# Optional: stream notebooks cell by cell instead of loading the whole
+# document (outputs with embedded images can be several MB)
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Optional: faster whole-document decoding when ijson isn't installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_loads = orjson.loads if orjson else json.loads
+
+# Read notebooks in 1 MiB chunks: a typical notebook is a handful of reads
+_READ_BUFFER = 1 << 20
+
+# orjson can parse straight from a memory map of files at least this big;
+# smaller ones are cheaper to just read
+_MMAP_MIN_SIZE = 64 * 1024
+
+# Invalid UTF-8 surfaces as UnicodeDecodeError from json.loads rather than
+# as a JSONDecodeError
+_JSON_ERRORS = (json.JSONDecodeError, UnicodeDecodeError) + ((ijson.JSONError,) if ijson else ())
+
+def _cell_text(cell):
+    """A cell as (cell_type, source joined into one string)"""
+    # Indexing both keys doubles as the per-cell shape check
+    return cell['cell_type'], ''.join(cell['source'])
+
+def _decode(f):
+    """Decode a whole notebook file, from a memory map where that saves a copy"""
+    if orjson is None or os.fstat(f.fileno()).st_size < _MMAP_MIN_SIZE:
+        return _loads(f.read())
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        with memoryview(mm) as view:
+            return orjson.loads(view)
+
+def _metadata_dict(metadata):
+    """Notebook metadata, with a missing or non-object value (e.g. null) read as empty"""
+    return metadata if isinstance(metadata, dict) else {}
+
+@functools.lru_cache(maxsize=4)
+def _read_notebook(notebook_path, strict=False):
+    """Read a notebook's format version, cells, as (cell_type, source text) pairs, and metadata
+
+    With strict, the result also has 'schema_error' from nbformat's validation.
+    """
+    with open(notebook_path, 'rb', buffering=_READ_BUFFER) as f:
+        # The schema check needs the whole document, so --strict decodes it
+        # once for both instead of streaming
+        if ijson is None or strict:
+            notebook = _decode(f)
+            if not isinstance(notebook, dict):
+                raise TypeError(f"top level is a JSON {type(notebook).__name__}, not an object")
+            summary = {
+                'nbformat': notebook.get('nbformat'),
+                'cells': [_cell_text(cell) for cell in notebook['cells']],
+                'metadata': _metadata_dict(notebook.get('metadata')),
+            }
+            if strict:
+                summary['schema_error'] = _strict_nbformat_check(notebook)
+            return summary
+        
+        return _stream_notebook(f)
+
+# The only cell fields the checks read; everything else, outputs included,
+# is skipped while streaming
+_CELL_FIELDS = ('cell_type', 'source')
+_CELL_FIELD_PREFIXES = frozenset({'cells.item.cell_type', 'cells.item.source', 'cells.item.source.item'})
+
+def _stream_notebook(f):
+    """Read the format version, cells and metadata in a single ijson pass"""
+    version, cells, cell, metadata = None, None, None, None
+    for prefix, event, value in ijson.parse(f, buf_size=_READ_BUFFER):
+        if prefix == 'cells.item':
+            if event == 'start_map':
+                cell = ijson.ObjectBuilder()
+            elif cell is None:
+                raise TypeError(f"cell is not an object: {event} {value!r}")
+            if event != 'map_key' or value in _CELL_FIELDS:
+                cell.event(event, value)
+            if event == 'end_map':
+                cells.append(_cell_text(cell.value))
+                cell = None
+        elif prefix in _CELL_FIELD_PREFIXES:
+            cell.event(event, value)
+        elif prefix == 'cells' and event == 'start_array':
+            cells = []
+        elif prefix == 'nbformat':
+            version = value
+        elif prefix == 'metadata' or prefix.startswith('metadata.'):
+            if metadata is None:
+                metadata = ijson.ObjectBuilder()
+            metadata.event(event, value)
+    if cells is None:
+        raise KeyError('cells')  # as indexing the decoded document would
+    # Reading to the end of the file has validated the rest of the JSON
+    return {
+        'nbformat': version,
+        'cells': cells,
+        'metadata': _metadata_dict(metadata.value if metadata is not None else None),
+    }
+
+def _quick_nbformat_check(notebook):
+    """Check the parsed notebook's shape; returns an error message or None"""
+    # Every cell already had its cell_type and source read in _read_notebook
+    if notebook['nbformat'] != 4:
+        return f"expected nbformat 4, found {notebook['nbformat']}"
+    return None
+
+def _strict_nbformat_check(notebook):
+    """Run nbformat's full schema validation on a decoded notebook; returns an error message or None"""
+    try:
+        import nbformat
+    except ImportError:
+        return "--strict needs nbformat (pip install nbformat)"
+    try:
+        nbformat.validate(nbformat.from_dict(notebook))
+    except nbformat.ValidationError as e:
+        return str(e)
+    return None
+
+def _load_notebook(notebook_path, out=None, strict=False):
+    """Parse a notebook once for all checks; returns None if it can't be read"""
+    # Test JSON validity
+    try:
+        notebook = _read_notebook(notebook_path, strict)
+    except FileNotFoundError:
+        print(f"❌ File not found: {notebook_path}", file=out)
+        return None
+    except OSError as e:
+        print(f"❌ Could not read {notebook_path}: {e}", file=out)
+        return None
+    except _JSON_ERRORS as e:
+        print(f"❌ JSON error: {e}", file=out)
+        return None
+    except (KeyError, TypeError) as e:
+        print(f"❌ Notebook format error: malformed notebook ({e!r})", file=out)
+        return None
+    print("✅ JSON structure: Valid", file=out)
     
-    if not Path(notebook_path).exists():
-        print(f"❌ File not found: {notebook_path}")
-        return False
+    # Test nbformat validity on what was already parsed; the full
+    # schema walk is slower, so it only runs with --strict
+    problem = _quick_nbformat_check(notebook)
+    if problem is None and strict:
+        problem = notebook['schema_error']
+    if problem is not None:
+        print(f"❌ Notebook format error: {problem}", file=out)
+        return None
+    print(f"✅ Notebook format: Valid ({len(notebook['cells'])} cells)", file=out)
+    return notebook
+
+def _keyword_re(keywords):
+    """Compile keywords into one case-insensitive pattern that also finds overlapping matches"""
+    alternation = '|'.join(map(re.escape, sorted(keywords, key=len, reverse=True)))
+    return re.compile(f'(?=({alternation}))', re.IGNORECASE)
+
+# Keyword groups, each matched with a single regex scan per cell
+_REQUIRED_SECTIONS = (
+    "ChatterBox TTS",
+    "Install Dependencies",
+    "Load ChatterBox TTS",
+    "Gradio Interface",
+    "Launch",
+    "Public URL"
+)
+_REQUIRED_SECTIONS_RE = _keyword_re(_REQUIRED_SECTIONS)
+_KAGGLE_FEATURES_RE = _keyword_re(("Kaggle", "Output tab", "internet access"))
+_COLAB_FEATURES_RE = _keyword_re(("Google Colab", "Runtime restart", "Open in Colab"))
+_PLATFORM_FEATURES = {
+    "Kaggle": _KAGGLE_FEATURES_RE,
+    "Colab": _COLAB_FEATURES_RE,
+}
+_GRADIO_KEYWORDS_RE = _keyword_re(("gradio", "share=True", "public URL", "demo.launch"))
+_PUBLIC_URL_RE = re.compile(r'share\s*=\s*true|public url', re.IGNORECASE)
+
+# Substrings the content-quality checks look for. One regex scan per
+# cell collects the ones present into a frozenset, and the checks below
+# probe that set instead of searching the text once per needle.
+_CONTENT_NEEDLES = (
+    'install', 'pip', 'package', 'chatterboxtts', 'from_pretrained',
+    'gr.blocks', 'create_gradio', 'share=true', 'public url',
+    'how to', 'usage', 'quick start', 'troubleshoot', 'error', 'problem',
+)
+
+def _needle_pattern(needle):
+    """Pattern for a needle; "chatterboxtts" also matches with spaces in between"""
+    if needle == 'chatterboxtts':
+        return ' *'.join(map(re.escape, needle))
+    return re.escape(needle)
+
+_CONTENT_NEEDLES_RE = re.compile(
+    '(?=' + '|'.join(
+        f'(?P<n{i}>{_needle_pattern(needle)})' for i, needle in enumerate(_CONTENT_NEEDLES)
+    ) + ')',
+    re.IGNORECASE,
+)
+
+def _content_needles(content):
+    """The set of content-check needles that occur in a cell's source"""
+    return frozenset(
+        _CONTENT_NEEDLES[int(match.lastgroup[1:])]
+        for match in _CONTENT_NEEDLES_RE.finditer(content)
+    )
+
+# Content-quality checks: name -> predicate on a cell's needle set
+_CONTENT_CHECKS = {
+    "Installation instructions": lambda f: 'install' in f and ('pip' in f or 'package' in f),
+    "Model loading": lambda f: 'chatterboxtts' in f or 'from_pretrained' in f,
+    "Gradio interface creation": lambda f: 'gr.blocks' in f or 'create_gradio' in f,
+    "Public URL launch": lambda f: 'share=true' in f or 'public url' in f,
+    "Usage instructions": lambda f: 'how to' in f or 'usage' in f or 'quick start' in f,
+    "Troubleshooting": lambda f: 'troubleshoot' in f or 'error' in f or 'problem' in f,
+}
+
+@dataclass
+class NotebookScan:
+    """Everything the checks look for, gathered by _scan_cells"""
+    total_cells: int = 0
+    markdown_cells: int = 0
+    code_cells: int = 0
+    sections: set = field(default_factory=set)
+    has_platform_features: bool = False
+    has_gradio: bool = False
+    has_public_url: bool = False
+    has_colab_metadata: bool = False
+    content_checks: dict = field(default_factory=lambda: dict.fromkeys(_CONTENT_CHECKS, False))
+
+def _scan_cells(notebook, platform):
+    """Run every keyword check over the (cell_type, source text) pairs"""
+    cells = notebook['cells']
     
-    try:
-        # Test JSON validity
-        with open(notebook_path, 'r', encoding='utf-8') as f:
-            notebook = json.load(f)
-        print("✅ JSON structure: Valid")
-        
-        # Test nbformat validity
-        try:
-            import nbformat
-            nb = nbformat.read(notebook_path, as_version=4)
-            print(f"✅ Notebook format: Valid ({len(nb.cells)} cells)")
-        except ImportError:
-            print("⚠️ nbformat not available - skipping format validation")
-        except Exception as e:
-            print(f"❌ Notebook format error: {e}")
-            return False
-        
-        # Test required sections
-        required_sections = [
-            "ChatterBox TTS",
-            "Install Dependencies", 
-            "Load ChatterBox TTS",
-            "Gradio Interface",
-            "Launch",
-            "Public URL"
-        ]
-        
-        found_sections = []
-        for cell in notebook['cells']:
-            if cell['cell_type'] == 'markdown':
-                content = ''.join(cell['source'])
-                for section in required_sections:
-                    if section.lower() in content.lower():
-                        found_sections.append(section)
-        
-        unique_sections = list(set(found_sections))
-        print(f"✅ Required sections: {len(unique_sections)}/{len(required_sections)} found")
-        
-        # Test platform-specific features
-        if platform == "Kaggle":
-            # Check for Kaggle-specific content
-            kaggle_features = ["Kaggle", "Output tab", "internet access"]
-            found_features = 0
-            for cell in notebook['cells']:
-                content = ''.join(cell.get('source', []))
-                for feature in kaggle_features:
-                    if feature.lower() in content.lower():
-                        found_features += 1
-                        break
-            print(f"✅ Kaggle features: {found_features > 0}")
-            
-        elif platform == "Colab":
-            # Check for Colab-specific metadata and content
-            has_colab_metadata = 'colab' in notebook.get('metadata', {})
-            print(f"✅ Colab metadata: {has_colab_metadata}")
-            
-            colab_features = ["Google Colab", "Runtime restart", "Open in Colab"]
-            found_features = 0
-            for cell in notebook['cells']:
-                content = ''.join(cell.get('source', []))
-                for feature in colab_features:
-                    if feature.lower() in content.lower():
-                        found_features += 1
-                        break
-            print(f"✅ Colab features: {found_features > 0}")
-        
-        # Test Gradio-specific content
-        gradio_keywords = ["gradio", "share=True", "public URL", "demo.launch"]
-        found_gradio = 0
-        for cell in notebook['cells']:
-            if cell['cell_type'] == 'code':
-                content = ''.join(cell.get('source', []))
-                for keyword in gradio_keywords:
-                    if keyword.lower() in content.lower():
-                        found_gradio += 1
-                        break
-        print(f"✅ Gradio integration: {found_gradio > 0}")
-        
-        # Test public URL sharing
-        has_public_url = False
-        for cell in notebook['cells']:
-            content = ''.join(cell.get('source', []))
-            if 'share=True' in content or 'public URL' in content:
-                has_public_url = True
-                break
-        print(f"✅ Public URL sharing: {has_public_url}")
-        
-        return True
+    # Partition once; section headings are only looked for in markdown
+    # and Gradio usage only in code
+    markdown = [content for cell_type, content in cells if cell_type == 'markdown']
+    code = [content for cell_type, content in cells if cell_type == 'code']
+    scan = NotebookScan(
+        total_cells=len(cells),
+        markdown_cells=len(markdown),
+        code_cells=len(code),
+        has_colab_metadata='colab' in notebook['metadata'],
+    )
+    
+    # Each search stops as soon as it is satisfied
+    for content in markdown:
+        scan.sections.update(match.lower() for match in _REQUIRED_SECTIONS_RE.findall(content))
+        if len(scan.sections) == len(_REQUIRED_SECTIONS):
+            break
+    scan.has_gradio = any(_GRADIO_KEYWORDS_RE.search(content) for content in code)
+    
+    features = _PLATFORM_FEATURES.get(platform)
+    if features is not None:
+        scan.has_platform_features = any(features.search(content) for _, content in cells)
+    scan.has_public_url = any(_PUBLIC_URL_RE.search(content) for _, content in cells)
+    
+    pending_checks = dict(_CONTENT_CHECKS)
+    for _, content in cells:
+        needles = _content_needles(content)
+        for check, predicate in list(pending_checks.items()):
+            if predicate(needles):
+                scan.content_checks[check] = True
+                del pending_checks[check]
+        if not pending_checks:
+            break
+    
+    return scan
+
+def test_notebook_structure(scan, platform, out=None):
+    """Test notebook structure and content"""
+    # Test required sections
+    print(f"✅ Required sections: {len(scan.sections)}/{len(_REQUIRED_SECTIONS)} found", file=out)
+    
+    # Test platform-specific features
+    if platform == "Kaggle":
+        print(f"✅ Kaggle features: {scan.has_platform_features}", file=out)
         
-    except json.JSONDecodeError as e:
-        print(f"❌ JSON error: {e}")
-        return False
-    except Exception as e:
-        print(f"❌ Unexpected error: {e}")
-        return False
-
-def test_notebook_content_quality(notebook_path, platform):
+    elif platform == "Colab":
+        print(f"✅ Colab metadata: {scan.has_colab_metadata}", file=out)
+        print(f"✅ Colab features: {scan.has_platform_features}", file=out)
+    
+    # Test Gradio-specific content
+    print(f"✅ Gradio integration: {scan.has_gradio}", file=out)
+    
+    # Test public URL sharing
+    print(f"✅ Public URL sharing: {scan.has_public_url}", file=out)
+    
+    return True
+
+def test_notebook_content_quality(scan, platform, out=None):
     """Test the quality and completeness of notebook content"""
-    print(f"\n📋 Content Quality Check - {platform}")
-    print("-" * 40)
+    print(f"\n📋 Content Quality Check - {platform}", file=out)
+    print("-" * 40, file=out)
     
-    try:
-        with open(notebook_path, 'r', encoding='utf-8') as f:
-            notebook = json.load(f)
-        
-        total_cells = len(notebook['cells'])
-        markdown_cells = sum(1 for cell in notebook['cells'] if cell['cell_type'] == 'markdown')
-        code_cells = sum(1 for cell in notebook['cells'] if cell['cell_type'] == 'code')
-        
-        print(f"📊 Cell distribution:")
-        print(f"   Total cells: {total_cells}")
-        print(f"   Markdown cells: {markdown_cells}")
-        print(f"   Code cells: {code_cells}")
-        
-        # Check for comprehensive content
-        content_checks = {
-            "Installation instructions": False,
-            "Model loading": False,
-            "Gradio interface creation": False,
-            "Public URL launch": False,
-            "Usage instructions": False,
-            "Troubleshooting": False
-        }
-        
-        for cell in notebook['cells']:
-            content = ''.join(cell.get('source', [])).lower()
-            
-            if 'install' in content and ('pip' in content or 'package' in content):
-                content_checks["Installation instructions"] = True
-            if 'chatterboxtts' in content.replace(' ', '') or 'from_pretrained' in content:
-                content_checks["Model loading"] = True
-            if 'gr.blocks' in content or 'create_gradio' in content:
-                content_checks["Gradio interface creation"] = True
-            if 'share=true' in content or 'public url' in content:
-                content_checks["Public URL launch"] = True
-            if 'how to' in content or 'usage' in content or 'quick start' in content:
-                content_checks["Usage instructions"] = True
-            if 'troubleshoot' in content or 'error' in content or 'problem' in content:
-                content_checks["Troubleshooting"] = True
-        
-        passed_checks = sum(content_checks.values())
-        print(f"\n✅ Content completeness: {passed_checks}/{len(content_checks)}")
-        for check, passed in content_checks.items():
-            status = "✅" if passed else "❌"
-            print(f"   {status} {check}")
+    print(f"📊 Cell distribution:", file=out)
+    print(f"   Total cells: {scan.total_cells}", file=out)
+    print(f"   Markdown cells: {scan.markdown_cells}", file=out)
+    print(f"   Code cells: {scan.code_cells}", file=out)
+    
+    # Check for comprehensive content
+    content_checks = scan.content_checks
+    passed_checks = sum(content_checks.values())
+    print(f"\n✅ Content completeness: {passed_checks}/{len(content_checks)}", file=out)
+    for check, passed in content_checks.items():
+        status = "✅" if passed else "❌"
+        print(f"   {status} {check}", file=out)
+    
+    return passed_checks >= len(content_checks) * 0.8  # 80% threshold
+
+def _validate_notebook(notebook_path, platform, strict=False):
+    """Run every check on one notebook; returns (passed, printed report)"""
+    out = io.StringIO()
+    print(f"🧪 Testing {platform} Notebook", file=out)
+    print("=" * 40, file=out)
+    
+    # Parse once; both checks share the result
+    notebook = _load_notebook(notebook_path, out, strict)
+    if notebook is None:
+        structure_ok = content_ok = False
+    else:
+        scan = _scan_cells(notebook, platform)
         
-        return passed_checks >= len(content_checks) * 0.8  # 80% threshold
+        # Test structure
+        structure_ok = test_notebook_structure(scan, platform, out)
         
-    except Exception as e:
-        print(f"❌ Content quality check failed: {e}")
-        return False
+        # Test content quality
+        content_ok = test_notebook_content_quality(scan, platform, out)
+    
+    overall_ok = structure_ok and content_ok
+    print(f"\n🎯 {platform} Overall: {'✅ PASS' if overall_ok else '❌ FAIL'}", file=out)
+    print(file=out)
+    return overall_ok, out.getvalue()
 
-def main():
+def main(argv=None):
     """Main test function"""
+    parser = argparse.ArgumentParser(description="Validate the ChatterBox TTS Gradio notebooks")
+    parser.add_argument("--strict", action="store_true",
+                       help="Also run nbformat's full schema validation")
+    args = parser.parse_args(argv)
+    
     print("🧪 ChatterBox TTS Notebook Test Suite")
     print("=" * 60)
     print()
@@ -188,51 +375,54 @@ def main():
         ("chatterbox_colab_gradio.ipynb", "Colab")
     ]
     
-    results = []
+    # The notebooks are independent, so check them concurrently; each
+    # report is buffered and printed whole, in the original order
+    with ThreadPoolExecutor(max_workers=len(notebooks)) as executor:
+        reports = list(executor.map(
+            lambda notebook: _validate_notebook(*notebook, strict=args.strict), notebooks
+        ))
+    # Nothing reads the parsed notebooks after this; drop the cached copies
+    _read_notebook.cache_clear()
     
-    for notebook_path, platform in notebooks:
-        # Test structure
-        structure_ok = test_notebook_structure(notebook_path, platform)
-        
-        # Test content quality
-        content_ok = test_notebook_content_quality(notebook_path, platform)
-        
-        overall_ok = structure_ok and content_ok
+    # The reports and the summary go out in a single write
+    out = io.StringIO()
+    results = []
+    for (_, platform), (overall_ok, report) in zip(notebooks, reports):
+        out.write(report)
         results.append((platform, overall_ok))
-        
-        print(f"\n🎯 {platform} Overall: {'✅ PASS' if overall_ok else '❌ FAIL'}")
-        print()
     
     # Summary
-    print("📊 Test Results Summary")
-    print("=" * 60)
+    print("📊 Test Results Summary", file=out)
+    print("=" * 60, file=out)
     
     passed = 0
     total = len(results)
     
     for platform, result in results:
         status = "✅ PASS" if result else "❌ FAIL"
-        print(f"{status} {platform} Notebook")
+        print(f"{status} {platform} Notebook", file=out)
         if result:
             passed += 1
     
-    print(f"\n🎯 Overall: {passed}/{total} notebooks passed")
+    print(f"\n🎯 Overall: {passed}/{total} notebooks passed", file=out)
     
     if passed == total:
-        print("\n🎉 All notebooks are ready for use!")
-        print("\n🚀 Ready to deploy:")
-        print("1. Upload chatterbox_kaggle_gradio.ipynb to Kaggle")
-        print("2. Open chatterbox_colab_gradio.ipynb in Google Colab")
-        print("3. Both will generate public URLs for instant sharing")
+        print("\n🎉 All notebooks are ready for use!", file=out)
+        print("\n🚀 Ready to deploy:", file=out)
+        print("1. Upload chatterbox_kaggle_gradio.ipynb to Kaggle", file=out)
+        print("2. Open chatterbox_colab_gradio.ipynb in Google Colab", file=out)
+        print("3. Both will generate public URLs for instant sharing", file=out)
         
-        print("\n🔗 Public URL Features:")
-        print("• Instant worldwide access")
-        print("• No installation required for users")
-        print("• Professional Gradio interface")
-        print("• Voice cloning and TTS capabilities")
-        print("• Collaborative testing environment")
+        print("\n🔗 Public URL Features:", file=out)
+        print("• Instant worldwide access", file=out)
+        print("• No installation required for users", file=out)
+        print("• Professional Gradio interface", file=out)
+        print("• Voice cloning and TTS capabilities", file=out)
+        print("• Collaborative testing environment", file=out)
     else:
-        print("\n⚠️ Some notebooks have issues. Please check the errors above.")
+        print("\n⚠️ Some notebooks have issues. Please check the errors above.", file=out)
+    
+    sys.stdout.write(out.getvalue())
     
     return passed == total
 